@@ -0,0 +1,219 @@
+import heapq # Priority queues for dijkstra and a*
+import math # Infinite distances
+from collections import deque # Breadth first search queue
+from itertools import count # Tie breaker so heaps never compare node names
+
+# Algorithms on Graph objects. Nodes may be given in any form the graph accepts, results use node names.
+
+
+def bfs(graph, source, target = None): # Nodes in the order they are visited, stopping at target
+    source = _name(graph, source)
+    target = _name(graph, target) if target is not None else None
+
+    order = []
+    seen = {source}
+    queue = deque([source])
+    while queue:
+        u = queue.popleft()
+        order.append(u)
+        if u == target:
+            break
+        for v, _ in graph.successors(u):
+            if v not in seen:
+                seen.add(v)
+                queue.append(v)
+
+    return order
+
+
+def dfs(graph, source, target = None): # Nodes in the order they are visited, stopping at target
+    source = _name(graph, source)
+    target = _name(graph, target) if target is not None else None
+
+    order = []
+    seen = set()
+    stack = [source]
+    while stack:
+        u = stack.pop()
+        if u in seen:
+            continue
+        seen.add(u)
+        order.append(u)
+        if u == target:
+            break
+        stack.extend(v for v, _ in reversed(list(graph.successors(u))) if v not in seen) # Reversed so neighbours are visited in order
+
+    return order
+
+
+def connected_components(graph): # Lists of node names, edge direction is ignored
+    components = []
+    seen = set()
+    for n in graph.nodes:
+        if n.name in seen:
+            continue
+
+        component = [n.name]
+        seen.add(n.name)
+        stack = [n.name]
+        while stack:
+            u = stack.pop()
+            for v, _ in graph.successors(u):
+                if v not in seen:
+                    seen.add(v)
+                    component.append(v)
+                    stack.append(v)
+            if graph.directed:
+                for v, _ in graph.predecessors(u):
+                    if v not in seen:
+                        seen.add(v)
+                        component.append(v)
+                        stack.append(v)
+        components.append(component)
+
+    return components
+
+
+def dijkstra(graph, source, target = None, weight = 'cost'): # Returns (distances, previous node on shortest path)
+    source = _name(graph, source)
+    target = _name(graph, target) if target is not None else None
+
+    dist = {source: 0}
+    prev = {source: None}
+    done = set()
+    tie = count()
+    heap = [(0, next(tie), source)]
+    while heap:
+        d, _, u = heapq.heappop(heap)
+        if u in done:
+            continue # Stale entry, u was reached more cheaply
+        done.add(u)
+        if u == target:
+            break
+
+        for v, edge in graph.successors(u):
+            alt = d + _weight(edge, weight)
+            if alt < dist.get(v, math.inf):
+                dist[v] = alt
+                prev[v] = u
+                heapq.heappush(heap, (alt, next(tie), v))
+
+    return dist, prev
+
+
+def shortest_path(graph, source, target, weight = 'cost'): # List of node names from source to target, or None
+    dist, prev = dijkstra(graph, source, target, weight)
+    return path(prev, _name(graph, target))
+
+
+def astar(graph, source, target, heuristic = None, weight = 'cost'): # heuristic(name, target name) must not overestimate
+    source = _name(graph, source)
+    target = _name(graph, target)
+    heuristic = heuristic or (lambda u, v: 0)
+
+    dist = {source: 0}
+    prev = {source: None}
+    done = set()
+    tie = count()
+    heap = [(heuristic(source, target), next(tie), source)]
+    while heap:
+        _, _, u = heapq.heappop(heap)
+        if u in done:
+            continue
+        if u == target:
+            return path(prev, target)
+        done.add(u)
+
+        for v, edge in graph.successors(u):
+            alt = dist[u] + _weight(edge, weight)
+            if alt < dist.get(v, math.inf):
+                dist[v] = alt
+                prev[v] = u
+                heapq.heappush(heap, (alt + heuristic(v, target), next(tie), v))
+
+    return None
+
+
+def bidirectional_search(graph, source, target, weight = 'cost'): # Dijkstra from both ends, returns a path or None
+    source = _name(graph, source)
+    target = _name(graph, target)
+    if source == target:
+        return [source]
+
+    dist = [{source: 0}, {target: 0}] # Forward and backward searches
+    prev = [{source: None}, {target: None}]
+    done = [set(), set()]
+    tie = count()
+    heaps = [[(0, next(tie), source)], [(0, next(tie), target)]]
+    steps = [graph.successors, graph.predecessors]
+
+    best, meeting = math.inf, None
+    while heaps[0] and heaps[1]:
+        if heaps[0][0][0] + heaps[1][0][0] >= best: # No shorter path can be found
+            break
+
+        side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1 # Expand the closer frontier
+        d, _, u = heapq.heappop(heaps[side])
+        if u in done[side]:
+            continue
+        done[side].add(u)
+
+        for v, edge in steps[side](u):
+            alt = d + _weight(edge, weight)
+            if alt < dist[side].get(v, math.inf):
+                dist[side][v] = alt
+                prev[side][v] = u
+                heapq.heappush(heaps[side], (alt, next(tie), v))
+            if v in dist[1 - side] and alt + dist[1 - side][v] < best:
+                best, meeting = alt + dist[1 - side][v], v
+
+    if meeting is None:
+        return None
+    return path(prev[0], meeting) + list(reversed(path(prev[1], meeting)))[1:]
+
+
+def all_pairs_shortest_paths(graph, weight = 'cost'): # Floyd-Warshall, O(V^3) so only for small graphs
+    names = [n.name for n in graph.nodes]
+    dist = {u: {v: math.inf for v in names} for u in names}
+    for u in names:
+        dist[u][u] = 0
+        for v, edge in graph.successors(u):
+            dist[u][v] = min(dist[u][v], _weight(edge, weight))
+
+    for k in names:
+        dist_k = dist[k]
+        for u in names:
+            dist_u = dist[u]
+            d_uk = dist_u[k]
+            if d_uk == math.inf:
+                continue
+            for v in names:
+                if d_uk + dist_k[v] < dist_u[v]:
+                    dist_u[v] = d_uk + dist_k[v]
+
+    return dist
+
+
+def path(prev, target): # Follow previous pointers back from target, None if target wasn't reached
+    if target not in prev:
+        return None
+
+    nodes = []
+    while target is not None:
+        nodes.append(target)
+        target = prev[target]
+    return list(reversed(nodes))
+
+
+def _name(graph, node):
+    n = graph.get_node(node)
+    if n is None:
+        raise ValueError(f'Node {node} is not in the graph.')
+    return n.name
+
+
+def _weight(edge, weight): # Edges without the weight attribute cost 1, as do all edges if weight is None
+    w = getattr(edge, weight, 1) if weight is not None else 1
+    if w < 0:
+        raise ValueError(f'Edge ({edge.u}, {edge.v}) has negative {weight} {w}.')
+    return w
@@ -0,0 +1,202 @@
+from graph import Graph # Benchmarked
+from layout import Layout # Benchmarked
+import argparse # Command line options
+import json # Machine readable results
+import os # Headless pygame, locating the repository
+import platform # Recorded with results
+import random # Seeded queries
+import subprocess # Recorded commit
+import sys # Output
+import time # Timing
+import tracemalloc # Memory benchmarks
+
+# Benchmarks graph operations, layout and rendering on seeded random graphs, e.g.
+#   python benchmark.py --output before.json
+# Results are written as JSON so runs on different commits can be compared.
+
+sizes = [10, 100, 1000, 10000, 100000]
+regimes = {'sparse': 4, 'dense': 0.1} # Average degree for sparse graphs, edge probability for dense ones
+max_edges = 10 ** 6 # Skip graphs larger than this
+queries = 10000 # Lookups timed per query benchmark
+
+
+def benchmarks(): # (name, maximum nodes, function(graph, rng) -> seconds, or bytes for names starting with memory)
+    return [
+        ('memory_bare', None, memory_bare),
+        ('memory_attributes', None, memory_attributes),
+        ('construct_random', None, construct_random),
+        ('construct_add_edges', None, construct_add_edges),
+        ('construct_add_edge', 10000, construct_add_edge),
+        ('has_edge', None, has_edge),
+        ('get_node', None, get_node),
+        ('get_neighbours', None, get_neighbours),
+        ('remove_edge', None, remove_edge),
+        ('layout_step_exact', 2000, lambda g, rng: layout_step(g, rng, 'exact')),
+        ('layout_step_barnes_hut', 10000, lambda g, rng: layout_step(g, rng, 'barnes_hut')),
+        ('redraw', 10000, redraw)
+    ]
+
+
+def memory_bare(g, rng): # Memory used by a copy of the graph
+    edges = [(e.u, e.v) for e in g.edges]
+    tracemalloc.start()
+    h = Graph(len(g.nodes), edges)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size
+
+
+def memory_attributes(g, rng): # As above, with a colour on each node and a cost on each edge as in example.py
+    nodes = [{'name': n.name, 'colour': (0, 200, 200)} for n in g.nodes]
+    edges = [{'u': e.u, 'v': e.v, 'cost': rng.randint(1, 20)} for e in g.edges]
+    tracemalloc.start()
+    h = Graph(nodes, edges)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size
+
+
+def construct_random(g, rng):
+    start = time.perf_counter()
+    Graph.random(len(g.nodes), _probability(g), seed = 0)
+    return time.perf_counter() - start
+
+
+def construct_add_edges(g, rng):
+    edges = [(e.u, e.v) for e in g.edges]
+    start = time.perf_counter()
+    Graph(len(g.nodes), edges)
+    return time.perf_counter() - start
+
+
+def construct_add_edge(g, rng):
+    edges = [(e.u, e.v) for e in g.edges]
+    start = time.perf_counter()
+    h = Graph(len(g.nodes))
+    for edge in edges:
+        h.add_edge(edge)
+    return time.perf_counter() - start
+
+
+def has_edge(g, rng):
+    n = len(g.nodes)
+    pairs = [(rng.randrange(n), rng.randrange(n)) for _ in range(queries)]
+    start = time.perf_counter()
+    for pair in pairs:
+        g.has_edge(pair)
+    return time.perf_counter() - start
+
+
+def get_node(g, rng):
+    names = [rng.randrange(len(g.nodes)) for _ in range(queries)]
+    start = time.perf_counter()
+    for name in names:
+        g.get_node(name)
+    return time.perf_counter() - start
+
+
+def get_neighbours(g, rng):
+    names = [rng.randrange(len(g.nodes)) for _ in range(queries)]
+    start = time.perf_counter()
+    for name in names:
+        g.get_neighbours(name)
+    return time.perf_counter() - start
+
+
+def remove_edge(g, rng): # Removes up to queries random edges from a copy of the graph
+    h = Graph(len(g.nodes), [(e.u, e.v) for e in g.edges])
+    pairs = [(e.u, e.v) for e in rng.sample(h.edges, min(queries, len(h.edges)))]
+    start = time.perf_counter()
+    for pair in pairs:
+        h.remove_edge(pair)
+    return time.perf_counter() - start
+
+
+def layout_step(g, rng, repulsion): # One iteration of the force simulation
+    layout = Layout(g, repulsion = repulsion)
+    layout.grid()
+    pseudo_edges = layout._pseudo_edges()
+    start = time.perf_counter()
+    layout._step(pseudo_edges)
+    return time.perf_counter() - start
+
+
+def redraw(g, rng):
+    if _display is None:
+        return None
+
+    d = _display.DisplayGraph(g, show_labels = True)
+    d.show()
+    d.invalidate() # Otherwise there's nothing to redraw
+    start = time.perf_counter()
+    d.redraw()
+    elapsed = time.perf_counter() - start
+    d.close() # Stop observing and quit pygame before the next repeat
+    return elapsed
+
+
+def run(sizes = sizes, repeats = 3, only = None):
+    results = []
+    for n in sizes:
+        for regime, density in regimes.items():
+            p = min(1, density / max(1, n - 1)) if regime == 'sparse' else density
+            if p * n * (n - 1) / 2 > max_edges:
+                continue
+
+            g = Graph.random(n, p, seed = 0)
+            for name, max_n, function in benchmarks():
+                if (only and name not in only) or (max_n is not None and n > max_n):
+                    continue
+
+                times = [function(g, random.Random(i)) for i in range(repeats)]
+                if None in times: # Unavailable, e.g. pygame isn't installed
+                    continue
+                unit = 'bytes' if name.startswith('memory') else 'seconds'
+                results.append({'benchmark': name, 'nodes': n, 'edges': len(g.edges), 'regime': regime, unit: min(times), 'repeats': repeats})
+                print(f'{name:24} {regime:6} {n:>7} nodes {len(g.edges):>8} edges ' + (f'{min(times):10d} B' if unit == 'bytes' else f'{min(times):10.6f} s'), file = sys.stderr)
+
+    return results
+
+
+def metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output = True, text = True, cwd = os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = None
+    return {'commit': commit or None, 'python': platform.python_version(), 'platform': platform.platform(), 'time': time.time()}
+
+
+def _probability(g):
+    n = len(g.nodes)
+    return len(g.edges) / (n * (n - 1) / 2) if n > 1 else 0
+
+
+_display = None # display module, loaded with a dummy video driver if pygame is available
+
+
+def _load_display():
+    global _display
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    try:
+        import display
+        display._import_pygame()
+        _display = display
+    except ImportError:
+        print('pygame is not installed, skipping rendering benchmarks', file = sys.stderr)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Benchmark graph operations, layout and rendering.')
+    parser.add_argument('--sizes', type = int, nargs = '+', default = sizes, help = 'numbers of nodes to benchmark')
+    parser.add_argument('--repeats', type = int, default = 3, help = 'runs per benchmark, the fastest is reported')
+    parser.add_argument('--only', nargs = '+', help = 'names of benchmarks to run')
+    parser.add_argument('--output', help = 'file to write JSON results to, default stdout')
+    args = parser.parse_args()
+
+    _load_display()
+    results = {'metadata': metadata(), 'results': run(args.sizes, args.repeats, args.only)}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent = 2)
+    else:
+        json.dump(results, sys.stdout, indent = 2)
@@ -0,0 +1,56 @@
+from collections import OrderedDict # LRU ordering
+import algorithms # Cached computations
+from graph import Graph # Copies to lay out
+import layout # Cached positions
+
+class ResultCache(): # Memoizes results derived from a graph until the graph's version changes
+    def __init__(self, graph, size = 128):
+        self.graph = graph
+        self.size = size # Maximum number of results kept, least recently used are evicted first
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._version = graph.version
+        self._results = OrderedDict()
+
+    def get(self, key, compute): # Cached result for key, calling compute() to produce it if needed
+        if self.graph.version != self._version: # Graph has changed, everything is stale
+            self.clear()
+            self._version = self.graph.version
+
+        if key in self._results:
+            self.hits += 1
+            self._results.move_to_end(key)
+            return self._results[key]
+
+        self.misses += 1
+        result = compute()
+        self._results[key] = result
+        if len(self._results) > self.size:
+            self._results.popitem(last = False)
+            self.evictions += 1
+        return result
+
+    def clear(self):
+        self._results.clear()
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'size': len(self._results)}
+
+    def components(self):
+        return self.get(('components',), lambda: algorithms.connected_components(self.graph))
+
+    def degrees(self, direction = None):
+        return self.get(('degrees', direction), lambda: {n.name: self.graph.degree(n, direction) for n in self.graph.nodes})
+
+    def shortest_paths(self, source, weight = 'cost'): # (distances, previous node) from source
+        source = self.graph.get_node(source).name
+        return self.get(('shortest_paths', source, weight), lambda: algorithms.dijkstra(self.graph, source, weight = weight))
+
+    def positions(self, width = 1000, height = 1000, **kwargs): # Layout positions, {name: (x, y)}
+        key = ('positions', width, height, tuple(sorted(kwargs.items())))
+        return self.get(key, lambda: layout.layout(self._copy(), width, height, **kwargs))
+
+    def _copy(self): # Bare copy of the graph's structure, so laying it out doesn't move the graph's own nodes
+        g = self.graph
+        return Graph([n.name for n in g.nodes], [(e.u, e.v) for e in g.edges], g.directed)
@@ -18,8 +18,8 @@ def dijkstra_animated(g, source):
         n.colour = (0, 200, 200)
         unvisited.append(n)
 
-    g.nodes[source].dist = 0
-    g.nodes[source].colour = g.default_node_colour
+    g.get_node(source).dist = 0
+    g.get_node(source).colour = g.default_node_colour
 
     while len(unvisited) > 0:
         nxt = min(unvisited, key = lambda k: k.dist)
@@ -33,7 +33,7 @@ def dijkstra_animated(g, source):
             g.redraw()
             sleep(0.2)
             alt = nxt.dist + e.cost
-            other = g.nodes[e.other(nxt.name)]
+            other = g.get_node(e.other(nxt.name))
             if alt < other.dist:
                 other.dist = alt
                 other.prev = nxt
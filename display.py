@@ -1,54 +1,111 @@
-from graph import Graph # Base class
-import math # Distibrution, drawing, calculations
-import random # Spread nodes out initially, create pseudo-edges to random node
-import copy # Build from a graph without modifying original
+from graph import Graph, NodeList, Edge # Base class, node lookup, background layout copy
+from layout import Layout # Distribution
+import math # Drawing, calculations
+import copy # Display a copy of a graph without modifying original
 import os # Set window position
-
 import contextlib
-with contextlib.redirect_stdout(None): # Suppress pygame welcome message
-    import pygame # Rendering engine
-import pygame.freetype # Text
-import pygame.gfxdraw # Antialiased edges
-import pygame.transform # Rotate objects
+import time # Profiling
+import multiprocessing # Background layout process
+import queue # Messages to and from the background layout
+import threading # Background layout thread
+from collections import OrderedDict # LRU cache of rendered surfaces
+from concurrent.futures import ProcessPoolExecutor # Export images in parallel
+from xml.sax.saxutils import escape # SVG text
+
+pygame = None # Rendering engine, imported on first use so layout only use doesn't load it
+_icon = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'icon.png') # Window icon, found wherever the program is run from
+
+def _import_pygame():
+    global pygame
+    if pygame is None:
+        with contextlib.redirect_stdout(None): # Suppress pygame welcome message
+            import pygame
+        import pygame.freetype # Text
+        import pygame.gfxdraw # Antialiased edges
+        import pygame.transform # Rotate objects
+    return pygame
 
 class DisplayGraph(Graph):
     background_colour = (0, 0, 0) # Background of the graph window
+    background_layout = None # In run, lay out in a 'thread' or 'process' while the window draws the latest positions at target_fps
     circular_node_radius = 15 # Radius of circular nodes, square nodes are based on text size
     default_edge_colour = (255, 255, 255) # Colour edges are drawn if they don't have a colour attribute
     default_node_colour = (0, 0, 0) # As above, for nodes
+    dirty_limit = 256 # Redraw the whole window rather than the changed regions once more nodes and edges than this have changed
     edge_label_colour = (0, 0, 0) # Colour of labels on edges
     edge_label_style = 'offset' # Style in which edges are labelled: can be 'offset', 'circle'
     edge_labels = 'label' # Attribute of edges to be printed as labels
     edge_width = 3 # Width of edges between nodes
     font_size = 14 # Font size for labels
+    incremental_layout = False # While dragging, only relax the held node's neighbourhood, distributing fully on release, always so when laying out components
     node_border_colour = (255, 255, 255) # Border colour for the nodes
     node_border_width = 3 # Width of borders around nodes
     node_labels = 'label' # Attribute of the nodes associated with their label
     node_shape = 'square' # Square nodes look better overall
     node_text_padding = 5 # Space to leave between text and border of square nodes
+    label_angle_step = 5 # Rotated edge labels are cached per this many degrees of rotation
+    lod_node_radius = 2 # Size of the squares nodes are drawn as at low detail
+    lod_nodes = 1000 # Draw at low detail, with thin edges and no labels, arrows or anti-aliasing, above this many nodes on screen
+    lod_zoom = 0.5 # or when zoomed out further than this
+    surface_cache_size = 2048 # Number of rendered labels and node sprites kept between redraws
+    spatial_cell_size = 64 # Side length of the cells of the grid used for hit testing and culling
+    profiler = None # profiling.Profiler recording draw, event and layout timings, see enable_profiling
     show_edge_labels = False # Show edge labels such as cost on edges
     show_node_labels = False # Show labels next to nodes such as distance etc
+    target_fps = 60 # Frame rate of the background_layout render loop
     text_colour = (255, 255, 255) # Colour of text for labels
     window_start_centered = True # Start window in centre screen
     # window_start_position = (0, 30) # Offset from top left
     window_title = 'Graph' # Caption at top of window
+    zoom_step = 1.2 # Zoom factor per step of the mouse wheel
+    view = False # Display the graph itself rather than a copy, keeping positions and other display state in an overlay
 
     def __init__(self, graph, width = 1000, height = 1000, **kwargs):
-        graph = copy.deepcopy(graph) # Leave original graph as is
-        super().__init__(graph.nodes, graph.edges, graph.directed) # Make the parent a clone of the original 
-        
+        self._original = graph # Display state can be copied back to it with write_back
+        self._dirty = None # Screen rects to repaint on the next redraw, or None to redraw the whole window, see _changed
+        self._changed_nodes = set() # Nodes and edges which have changed since the last redraw
+        self._changed_edges = set()
+        self._moved = set() # Nodes whose x or y has been set since they were last moved in the grid
+        self._regrid = False # Whether nodes have been added or removed since the grid was built
+        self._edge_grid = None # Edges by layout position, built for the first partial redraw
+        self._edge_order = {} # Edge -> index in edges when the edge grid was built
+        self._node_order = {} # Node -> index in nodes, see _by_node_order
+        self._node_order_version = None
+        self._scratch = None # Surface partial redraws are drawn on
+        if kwargs.get('view', self.view): # Share nodes and edges with the original, no copying or revalidation
+            if not isinstance(graph, Graph):
+                raise TypeError(f'Type {type(graph)} can\'t be viewed, use a Graph.')
+            self.graph = graph
+            self._nodes = _NodeOverlay(graph, self._changed)
+        else:
+            if not isinstance(graph, Graph): # e.g. a FrozenGraph
+                graph = Graph(graph.nodes, graph.edges, graph.directed)
+            self.graph = copy.deepcopy(graph) # Leave original graph as is, the copy's indexes are already consistent
+            self._nodes = self.graph._nodes
+
         self.width = width # Window width
         self.height = height # and height
         self.screen = None # Pygame window used for display
         self.font = None # Pygame font renderer
+        self._label_extent = 0 # Largest size of a drawn edge label
+        self.zoom = 1 # Screen pixels per layout unit
+        self.offset = (0, 0) # Screen position of the layout origin
+        self._detailed = True # Whether the last redraw was at full detail
+        self._window = False # Whether screen is a window, rather than an offscreen surface or None
+        self._panning = False
 
         for kwarg in kwargs:
             setattr(self, kwarg, kwargs[kwarg])
 
+        self._surfaces = _SurfaceCache(self.surface_cache_size) # Rendered text and node sprites, sized by the kwargs above
+        self._grid = _SpatialGrid(self.spatial_cell_size) # Node positions, for hit testing and culling
+        self._node_extent = self.circular_node_radius + self.node_border_width # Largest distance from a node centre to its edge
+
         self.running = False
         self.distributing = False
         self.holding = None
         self.holding_offset = (0, 0)
+        self._worker = None # _LayoutWorker while running with background_layout
 
         if 'show_labels' in kwargs:
             self.show_node_labels = kwargs['show_labels']
@@ -77,43 +134,346 @@ class DisplayGraph(Graph):
                 self.default_node_colour = (0, 140, 30)
                 self.node_border_colour = None
 
-        i = 0
-        grid_size = math.ceil(len(self.nodes) ** (1 / 2))
-        offset_x, offset_y = int(width * 0.1), int(height * 0.1)
-        n = len(self.nodes)
-        for y in range(0, int(self.height * 0.8), int((self.height * 0.8) / grid_size)):
-            for x in range(0, int(self.width * 0.8), int((self.width * 0.8) / grid_size)):
-                node = self.nodes[i]
-                node.x = x + offset_x
-                node.y = y + offset_y
-                node._x_force = 0
-                node._y_force = 0
-                i += 1
-                if i >= n:
-                    break
-            if i >= n:
-                break
+        self.layout = Layout(self, width, height, **{k: v for k, v in kwargs.items() if hasattr(Layout, k)}) # Layout settings such as repulsion
+        self.layout.grid()
+        self._grid.rebuild(self.nodes)
+        self._observing = False # Whether _changed is registered with the graph, from construction until close
+        self._watch()
+
+    # The displayed graph's structure, shared with the original in view mode
+    edges = property(lambda self: self.graph.edges, lambda self, edges: setattr(self.graph, 'edges', edges))
+    directed = property(lambda self: self.graph.directed, lambda self, directed: setattr(self.graph, 'directed', directed))
+    version = property(lambda self: self.graph.version, lambda self, version: setattr(self.graph, 'version', version))
+    _edge_index = property(lambda self: self.graph._edge_index, lambda self, index: setattr(self.graph, '_edge_index', index))
+    _out = property(lambda self: self.graph._out)
+    _in = property(lambda self: self.graph._in)
+    _observers = property(lambda self: self.graph._observers)
+
+    def observe(self, observer): # Observe the displayed graph, see Graph.observe. In view mode display state set on the overlay isn't reported
+        self.graph.observe(observer)
+
+    def unobserve(self, observer):
+        self.graph.unobserve(observer)
+
+    def write_back(self, attrs = None): # Copy display state such as x and y to the original graph's nodes, all public attributes if attrs is None
+        for n in self.nodes:
+            target = self._original.get_node(n.name)
+            if target is None: # Removed from the original since
+                continue
+            state = n.attributes() if attrs is None else {a: getattr(n, a) for a in attrs if hasattr(n, a)}
+            for key, value in state.items():
+                setattr(target, key, value)
 
     def init_window(self):
+        _import_pygame()
         pygame.init()
         pygame.display.set_caption(self.window_title)
-        pygame.display.set_icon(pygame.image.load('icon.png'))
+        if os.path.exists(_icon):
+            pygame.display.set_icon(pygame.image.load(_icon))
 
         # os.environ['SDL_VIDEO_WINDOW_POS'] = f'{self.window_start_position[0],self.window_start_position[1]}' # Place window. Doesn't seem to work
         if self.window_start_centered:
             os.environ['SDL_VIDEO_CENTERED'] = '1' # Unreliable.
         
-        self.screen = pygame.display.set_mode((self.width, self.height))
+        self._init_screen(pygame.display.set_mode((self.width, self.height)), True)
+
+    def init_surface(self): # Draw to an offscreen surface rather than a window, so images can be saved without a display
+        _import_pygame()
+        pygame.freetype.init()
+        self._init_screen(pygame.Surface((self.width, self.height)), False)
+
+    def _init_screen(self, screen, window):
+        if not self._observing: # Shown again after close, nodes may have moved since
+            self._watch()
+            self._grid.rebuild(self.nodes)
+            self._edge_grid = None
+        self.screen = screen
+        self._window = window
         self.font = pygame.freetype.Font(None, self.font_size)
+        self._surfaces = _SurfaceCache(self.surface_cache_size) # Surfaces rendered with another font are stale
 
+        self.invalidate()
         self.redraw()
-        
-    def redraw(self):
+
+    def save_image(self, path): # Save the graph as drawn. SVG is written directly without pygame, other formats are drawn offscreen if there's no window
+        if path.lower().endswith('.svg'):
+            with open(path, 'w') as f:
+                f.write(self.svg())
+        else:
+            if self.screen is None:
+                self.init_surface()
+            self.redraw()
+            pygame.image.save(self.screen, path)
+        return path
+
+    def svg(self): # The graph drawn as an SVG document. Without a font to measure text, square nodes are sized from the length of their names
+        z = self.zoom
+        ox, oy = self.offset
+        out = [
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{self.width}" height="{self.height}" font-family="sans-serif" font-size="{self.font_size}">',
+            f'<rect width="100%" height="100%" fill="{_svg_colour(self.background_colour)}"/>'
+        ]
+
+        for edge in self.edges: # As in _draw_edges
+            u = self._nodes[edge.u]
+            v = self._nodes[edge.v]
+            u = _Point(u.x * z + ox, u.y * z + oy)
+            v = _Point(v.x * z + ox, v.y * z + oy)
+            if u.y < v.y:
+                u, v = v, u
+
+            colour = _svg_colour(edge.colour if hasattr(edge, 'colour') else self.default_edge_colour)
+            out.append(f'<line x1="{u.x:g}" y1="{u.y:g}" x2="{v.x:g}" y2="{v.y:g}" stroke="{colour}" stroke-width="{self.edge_width}"/>')
+
+            direction = math.atan2((v.y - u.y), (v.x - u.x))
+            mid_point = (int((u.x + v.x) / 2), int((u.y + v.y) / 2))
+            left_point = ((mid_point[0] + (math.cos(direction - (math.pi / 2)) * 15)), (mid_point[1] + (math.sin(direction - (math.pi / 2)) * 15)))
+            if self.directed:
+                tip_point = ((mid_point[0] + (math.cos(direction) * 30)), (mid_point[1] + (math.sin(direction) * 30)))
+                out.append(f'<polygon points="{_svg_points([tip_point, left_point, mid_point])}" fill="{colour}"/>')
+
+            if self.show_edge_labels and hasattr(edge, self.edge_labels):
+                label = escape(str(getattr(edge, self.edge_labels)))
+                if self.directed:
+                    out.append(f'<text x="{mid_point[0]}" y="{mid_point[1]}" dominant-baseline="hanging" fill="{_svg_colour(self.text_colour)}">{label}</text>')
+                elif self.edge_label_style == 'circle':
+                    out.append(f'<circle cx="{mid_point[0]}" cy="{mid_point[1]}" r="10" fill="{colour}"/>')
+                    out.append(f'<text x="{mid_point[0]}" y="{mid_point[1]}" text-anchor="middle" dominant-baseline="central" fill="{_svg_colour(self.edge_label_colour)}">{label}</text>')
+                elif self.edge_label_style == 'offset':
+                    angle = math.degrees(((math.pi / 2) - direction) + math.pi / 2)
+                    x, y = left_point
+                    out.append(f'<text x="{x:g}" y="{y:g}" transform="rotate({-angle:g} {x:g} {y:g})" dominant-baseline="hanging" fill="{colour}">{label}</text>')
+
+        b = self.node_border_width
+        for n in self.nodes: # As in _node_sprite
+            colour = _svg_colour(n.colour if hasattr(n, 'colour') else self.default_node_colour)
+            border_colour = n.border_colour if hasattr(n, 'border_colour') else self.node_border_colour
+            text_colour = _svg_colour(n.text_colour if hasattr(n, 'text_colour') else self.text_colour)
+            x, y = n.x * z + ox, n.y * z + oy
+            name = str(n.name)
+
+            if self.node_shape == 'circle':
+                if border_colour:
+                    out.append(f'<circle cx="{x:g}" cy="{y:g}" r="{self.circular_node_radius + b}" fill="{_svg_colour(border_colour)}"/>')
+                out.append(f'<circle cx="{x:g}" cy="{y:g}" r="{self.circular_node_radius}" fill="{colour}"/>')
+            elif self.node_shape == 'square':
+                width, height = round(len(name) * self.font_size * 0.6), self.font_size # Roughly the rendered text size
+                p = self.node_text_padding * 2
+                left, top = x - (width // 2) - b, y - (height // 2) - b
+                if border_colour:
+                    out.append(f'<rect x="{left:g}" y="{top:g}" width="{width + p + 2 * b}" height="{height + p + 2 * b}" fill="{_svg_colour(border_colour)}"/>')
+                out.append(f'<rect x="{left + b:g}" y="{top + b:g}" width="{width + p}" height="{height + p}" fill="{colour}"/>')
+                x, y = left + b + 5 + width / 2, top + b + 5 + height / 2 # Centre of the text, as it's placed in the sprite
+            else:
+                continue
+            out.append(f'<text x="{x:g}" y="{y:g}" text-anchor="middle" dominant-baseline="central" fill="{text_colour}">{escape(name)}</text>')
+
+        out.append('</svg>')
+        return '\n'.join(out) + '\n'
+
+    def enable_profiling(self, profiler = None): # Attach a profiling.Profiler, returns it
+        if profiler is None:
+            from profiling import Profiler
+            profiler = Profiler()
+        self.profiler = profiler
+        self.layout.profiler = profiler
+        return profiler
+
+    def disable_profiling(self):
+        self.profiler = None
+        self.layout.profiler = None
+
+    def invalidate(self): # Make the next redraw repaint the whole window, not just what has changed
+        self._dirty = None
+
+    def redraw(self): # Repaints the regions of the window which have changed since the last redraw, or all of it
+        self._update_grid()
+        if self._dirty == []: # Nothing has changed
+            return
+        t = time.perf_counter() if self.profiler else 0
+        if self._dirty is None:
+            self._redraw_all()
+        else:
+            self._redraw_changed()
+        if self.profiler:
+            self.profiler.record('draw', t)
+
+    def _redraw_all(self):
         self.screen.fill(self.background_colour)
 
-        for edge in self.edges:
-            u = self.nodes[edge.u]
-            v = self.nodes[edge.v]
+        self._node_extent = max(self._node_extent, self.circular_node_radius + self.node_border_width) # They can be set after construction
+        m = self._node_extent
+        x0, y0 = self.to_layout(-m, -m)
+        x1, y1 = self.to_layout(self.width + m, self.height + m)
+        nodes = [n for n in self._grid.query(x0, y0, x1, y1) if x0 <= n.x <= x1 and y0 <= n.y <= y1] # Only nodes on screen
+        nodes = self._by_node_order(nodes)
+        self._detailed = self.zoom >= self.lod_zoom and len(nodes) <= self.lod_nodes
+        if self._detailed:
+            self._draw_edges()
+            self._draw_nodes(nodes)
+        else:
+            self._draw_edges_fast()
+            self._draw_nodes_fast(nodes)
+
+        if self._window:
+            pygame.display.update()
+        self._dirty = []
+        self._changed_nodes.clear()
+        self._changed_edges.clear()
+
+    def _redraw_changed(self): # Repaint the areas changed nodes and edges covered before they changed and cover now
+        if self._edge_grid is None:
+            self._edge_grid = _EdgeGrid(self.spatial_cell_size)
+            self._edge_order = {}
+            for i, edge in enumerate(self.edges):
+                self._edge_grid.move(edge, *self._edge_box(edge))
+                self._edge_order[edge] = i
+        rects = self._dirty
+        for n in self._changed_nodes:
+            rects.append(self._node_rect(n))
+        for edge in self._changed_edges:
+            self._edge_grid.move(edge, *self._edge_box(edge))
+            rects.extend(self._edge_rects(edge))
+
+        window = self.screen.get_rect()
+        rects = [r.clip(window) for r in rects]
+        rects = [r for r in rects if r.width and r.height] # Empty if off screen
+        if self._scratch is None or self._scratch.get_size() != window.size:
+            self._scratch = pygame.Surface(window.size, 0, self.screen)
+
+        # Anti-aliased lines are drawn differently when clipped, so everything touching the areas is drawn unclipped on a scratch
+        # surface, after clearing all of them so overlapping areas don't paint over each other, and the areas are copied across
+        m = self._edge_margin()
+        e = self._node_extent if self._detailed else self.lod_node_radius
+        edges = {}
+        nodes = {}
+        for rect in rects:
+            self._scratch.fill(self.background_colour, rect)
+            for edge in self._edge_grid.query(*self.to_layout(rect.left - m, rect.top - m), *self.to_layout(rect.right + m, rect.bottom + m)):
+                if edge not in edges and self._edge_near(edge, rect, m):
+                    edges[edge] = None
+            nodes.update(dict.fromkeys(self._grid.query(*self.to_layout(rect.left - e, rect.top - e), *self.to_layout(rect.right + e, rect.bottom + e))))
+        edges = sorted(edges, key = self._edge_order.get) # In the same order as a full redraw
+        nodes = self._by_node_order(nodes)
+
+        screen, self.screen = self.screen, self._scratch
+        try:
+            if self._detailed:
+                self._draw_edges(edges)
+                self._draw_nodes(nodes)
+            else:
+                self._draw_edges_fast(edges)
+                self._draw_nodes_fast(nodes)
+        finally:
+            self.screen = screen
+        for rect in rects:
+            self.screen.blit(self._scratch, rect, rect)
+
+        if self._window:
+            pygame.display.update(rects)
+        self._dirty = []
+        self._changed_nodes.clear()
+        self._changed_edges.clear()
+
+    def _relax_while_dragging(self): # Laying out components starts a process pool, too slow to do for every mouse motion
+        return self.incremental_layout or self.layout.layout_components
+
+    def _by_node_order(self, nodes): # Nodes sorted as in the graph, so overlapping nodes are drawn the same way whichever are culled
+        if self._node_order_version != self.version:
+            self._node_order = {n: i for i, n in enumerate(self.nodes)}
+            self._node_order_version = self.version
+        return sorted(nodes, key = self._node_order.__getitem__)
+
+    def _changed(self, item, key): # Observer of the displayed graph, called before item changes while it's still drawn as it was
+        if key in ['x', 'y'] and not self.distributing and not isinstance(item, (Graph, Edge)): # The grid is rebuilt after distributing
+            self._moved.add(self._nodes[item.name])
+        if key == 'nodes':
+            self._regrid = True
+        if self._dirty is None: # Everything will be redrawn, and positions may change without the edge grid being updated
+            self._edge_grid = None
+            return
+        if self.distributing or isinstance(item, Graph): # Nodes added or removed
+            self._dirty = None
+            self._edge_grid = None
+            return
+
+        if isinstance(item, Edge):
+            self._edge_changed(item)
+        else:
+            n = self._nodes[item.name] # In view mode, the view of a changed node
+            if n not in self._changed_nodes:
+                self._changed_nodes.add(n)
+                self._dirty.append(self._node_rect(n))
+            if key in ['x', 'y']:
+                for edge in self.graph.get_neighbour_edges(n.name):
+                    self._edge_changed(edge)
+
+        if len(self._changed_nodes) + len(self._changed_edges) > self.dirty_limit:
+            self._dirty = None
+            self._edge_grid = None
+
+    def _update_grid(self): # Move nodes whose positions have been set in the grid, which can't be done by _changed as it's called first
+        if self._regrid:
+            self._grid.rebuild(self.nodes)
+            self._regrid = False
+        else:
+            for n in self._moved:
+                self._grid.move(n)
+        self._moved.clear()
+
+    def _edge_changed(self, edge):
+        if edge not in self._changed_edges:
+            self._changed_edges.add(edge)
+            self._dirty.extend(self._edge_rects(edge))
+
+    def _node_rect(self, n): # Screen area a node may be drawn in
+        e = (self._node_extent if self._detailed else self.lod_node_radius) + 1
+        x, y = self.to_screen(n.x, n.y)
+        return pygame.Rect(int(x) - e, int(y) - e, 2 * e + 1, 2 * e + 1)
+
+    def _edge_rects(self, edge): # Screen areas an edge may be drawn in, squares along it so a long diagonal edge doesn't cover everything between its ends
+        m = self._edge_margin()
+        u, v = self._nodes[edge.u], self._nodes[edge.v]
+        (ux, uy), (vx, vy) = self.to_screen(u.x, u.y), self.to_screen(v.x, v.y)
+        steps = max(1, int(max(abs(vx - ux), abs(vy - uy)) // max(2 * m, 16)))
+        points = [(ux + (vx - ux) * i / steps, uy + (vy - uy) * i / steps) for i in range(steps + 1)]
+        return [pygame.Rect(int(min(x0, x1)) - m, int(min(y0, y1)) - m, int(abs(x1 - x0)) + 2 * m + 2, int(abs(y1 - y0)) + 2 * m + 2) for (x0, y0), (x1, y1) in zip(points, points[1:])]
+
+    def _edge_margin(self): # Distance arrows, labels and width extend past the line between an edge's nodes
+        if not self._detailed:
+            return 1
+        m = self.edge_width
+        if self.directed:
+            m += 30 # Arrow
+        if self.show_edge_labels:
+            m += 15 + self._label_extent
+        return m
+
+    def _edge_near(self, edge, rect, m): # Whether the line between an edge's nodes passes within m of the circle around rect
+        u, v = self._nodes[edge.u], self._nodes[edge.v]
+        (ux, uy), (vx, vy) = self.to_screen(u.x, u.y), self.to_screen(v.x, v.y)
+        cx, cy = rect.center
+        length = math.hypot(vx - ux, vy - uy)
+        if length == 0:
+            return True
+        return abs((vx - ux) * (uy - cy) - (ux - cx) * (vy - uy)) / length <= math.hypot(rect.width, rect.height) / 2 + m
+
+    def _edge_box(self, edge): # Layout bounding box of the line between an edge's nodes
+        u, v = self._nodes[edge.u], self._nodes[edge.v]
+        return (min(u.x, v.x), min(u.y, v.y), max(u.x, v.x), max(u.y, v.y))
+
+    def _draw_edges(self, edges = None):
+        m = 30 # Arrows and labels extend past the line between the nodes
+        z = self.zoom
+        ox, oy = self.offset
+        for edge in self.edges if edges is None else edges:
+            u = self._nodes[edge.u]
+            v = self._nodes[edge.v]
+            u = _Point(u.x * z + ox, u.y * z + oy) # Screen positions
+            v = _Point(v.x * z + ox, v.y * z + oy)
+
+            if max(u.x, v.x) < -m or min(u.x, v.x) > self.width + m or max(u.y, v.y) < -m or min(u.y, v.y) > self.height + m:
+                continue # Off screen
 
             if u.y < v.y:
                 u, v = v, u
@@ -146,199 +506,277 @@ class DisplayGraph(Graph):
                 label = str(getattr(edge, self.edge_labels))                
         
                 if self.directed:
-                    self.font.render_to(self.screen, mid_point, label, self.text_colour)
+                    label = self._text(label, self.text_colour)
+                    self.screen.blit(label, mid_point)
                 elif self.edge_label_style == 'circle':
                     pygame.draw.circle(self.screen, colour, mid_point, 10, 0)
 
                     x_off = -3 - ((len(label) // 2) * 3)
                     
-                    self.font.render_to(self.screen, (mid_point[0] + x_off, mid_point[1] -5), label, self.edge_label_colour)
+                    label = self._text(label, self.edge_label_colour)
+                    self.screen.blit(label, (mid_point[0] + x_off, mid_point[1] -5))
                 elif self.edge_label_style == 'offset':
-                    label = self.font.render(label, colour)[0]
-                    label = pygame.transform.rotozoom(label, math.degrees(((math.pi / 2) - direction) + math.pi / 2), 1)
+                    label = self._rotated_text(label, colour, math.degrees(((math.pi / 2) - direction) + math.pi / 2))
                     self.screen.blit(label, left_point)
+                else:
+                    continue
+                self._label_extent = max(self._label_extent, *label.get_size()) # For the areas changed edges are repainted in
 
-
-        for n in self.nodes:
+    def _draw_nodes(self, nodes):
+        z = self.zoom
+        ox, oy = self.offset
+        for n in nodes:
             colour = n.colour if hasattr(n, 'colour') else self.default_node_colour                
             border_colour = n.border_colour if hasattr(n, 'border_colour') else self.node_border_colour
             text_colour = n.text_colour if hasattr(n, 'text_colour') else self.text_colour
 
-            name = self.font.render(str(n.name), text_colour)[0] # name is a pygame 'surface'
-            width, height = name.get_size()
+            sprite = self._node_sprite(str(n.name), colour, border_colour, text_colour)
+            if sprite is None: # Unknown node shape
+                continue
 
-            if self.node_shape == 'circle':
-                if border_colour: # If no border colour is specified, assume no borders desired
-                    r = self.circular_node_radius + self.node_border_width
-                    pygame.gfxdraw.aacircle(self.screen, n.x, n.y, r, border_colour)
-                    pygame.gfxdraw.filled_circle(self.screen, n.x, n.y, r, border_colour)
+            surface, (dx, dy) = sprite
+            self.screen.blit(surface, (n.x * z + ox + dx, n.y * z + oy + dy))
 
-                pygame.gfxdraw.aacircle(self.screen, n.x, n.y, self.circular_node_radius, colour) # Use an aacircle to avoid jagged edges
-                pygame.gfxdraw.filled_circle(self.screen, n.x, n.y, self.circular_node_radius, colour) # Fill into the anti-aliased border
-                
-                self.screen.blit(name, (n.x - (width // 2), n.y - (height // 2))) # Print the node name into the center of the circle
+            if self.node_shape == 'square':
+                width, height = surface.get_size()
+                p = self.node_border_width * 2 # Sprites include space for the border whether or not it is drawn
+                n._y_size = (height - p + 16) // 2 # Used to check whether the node has been clicked
+                n._x_size = (width - p + 16) // 2 # as above
+                self._node_extent = max(self._node_extent, n._x_size, n._y_size)
 
-            elif self.node_shape == 'square':
-                x = n.x - (width // 2)
-                y = n.y - (height // 2)
-                p = self.node_text_padding * 2
-                width += p
-                height += p
-                rect = pygame.Rect(x, y, width, height)
+    def _draw_edges_fast(self, edges = None): # Edges as thin lines, batched into one polyline per node and colour
+        z = self.zoom
+        ox, oy = self.offset
+        w, h = self.width, self.height
+        if edges is None:
+            edges = self.edges
+            nodes = self.nodes
+        else:
+            nodes = [self._nodes[name] for edge in edges for name in [edge.u, edge.v]]
+        positions = {n.name: (n.x * z + ox, n.y * z + oy) for n in nodes} # Screen positions
+        batches = {} # (node, colour) -> points u, v1, u, v2, ..., which retraces back to u between edges
+        for edge in edges:
+            u = positions[edge.u]
+            v = positions[edge.v]
+            if (u[0] < 0 and v[0] < 0) or (u[0] > w and v[0] > w) or (u[1] < 0 and v[1] < 0) or (u[1] > h and v[1] > h):
+                continue # Off screen
 
-                if border_colour: # If no border colour is specified, assume no borders desired
-                    p = self.node_border_width * 2
-                    border_rect = pygame.Rect(x - self.node_border_width, y - self.node_border_width, width + p, height + p)
-                    pygame.draw.rect(self.screen, border_colour, border_rect)
-                
-                pygame.draw.rect(self.screen, colour, rect)
+            colour = _colour_key(getattr(edge, 'colour', self.default_edge_colour))
+            points = batches.get((edge.u, colour))
+            if points is None:
+                batches[(edge.u, colour)] = [u, v]
+            else:
+                points.append(u)
+                points.append(v)
 
-                self.screen.blit(name, (x + 5, y + 5))
+        for (_, colour), points in batches.items():
+            pygame.draw.lines(self.screen, colour, False, points)
 
-                n._y_size = (height + 16) // 2 # Used to check whether the node has been clicked
-                n._x_size = (width + 16) // 2 # as above
+    def _draw_nodes_fast(self, nodes): # Nodes as small squares, without labels
+        z = self.zoom
+        ox, oy = self.offset
+        r = self.lod_node_radius
+        for n in nodes:
+            colour = getattr(n, 'border_colour', self.node_border_colour) or getattr(n, 'colour', self.default_node_colour)
+            self.screen.fill(colour, (int(n.x * z + ox) - r, int(n.y * z + oy) - r, 2 * r + 1, 2 * r + 1))
 
-        pygame.display.update()
+    def to_screen(self, x, y): # Screen position of a layout position
+        return (x * self.zoom + self.offset[0], y * self.zoom + self.offset[1])
 
-    def scale(self):
-        x = [n.x for n in self.nodes]
-        x = max(x) - min(x)
-        x = (self.height / x) * 0.8 # 80 % of screen width
-        
-        y = [n.y for n in self.nodes]
-        y = max(y) - min(y)
-        y = (self.height / y) * 0.8 # 80 % of screen height
+    def to_layout(self, x, y): # Layout position of a screen position
+        return ((x - self.offset[0]) / self.zoom, (y - self.offset[1]) / self.zoom)
 
-        for n in self.nodes:
-            n.x = int(n.x * x)
-            n.y = int(n.y * y)
-            
-        adjust_x = int(min([n.x for n in self.nodes]) - (0.1 * self.width))
-        adjust_y = int(min([n.y for n in self.nodes]) - (0.1 * self.height))
+    def zoom_at(self, x, y, factor): # Zoom by factor, keeping the layout position at screen position (x, y) in place
+        self.zoom *= factor
+        self.offset = (x - (x - self.offset[0]) * factor, y - (y - self.offset[1]) * factor)
+        self.invalidate()
+
+    def pan(self, dx, dy): # Move the view by (dx, dy) pixels
+        self.offset = (self.offset[0] + dx, self.offset[1] + dy)
+        self.invalidate()
+
+    def _text(self, text, colour):
+        key = ('text', text, _colour_key(colour), self.font_size)
+        surface = self._surfaces.get(key)
+        if surface is None:
+            surface = self._surfaces.put(key, self.font.render(text, colour, size = self.font_size)[0])
+        return surface
+
+    def _rotated_text(self, text, colour, angle):
+        angle = round(angle / self.label_angle_step) * self.label_angle_step # Bucket angles so rotations can be reused
+        key = ('rotated', text, _colour_key(colour), angle, self.font_size)
+        surface = self._surfaces.get(key)
+        if surface is None:
+            surface = self._surfaces.put(key, pygame.transform.rotozoom(self._text(text, colour), angle, 1))
+        return surface
 
-        for n in self.nodes: # Shift scaled graph to fit on screen
-            n.x -= adjust_x
-            n.y -= adjust_y
+    def _node_sprite(self, name, colour, border_colour, text_colour): # Returns (surface, offset of its corner from the node centre)
+        key = ('node', self.node_shape, name, _colour_key(colour), _colour_key(border_colour), _colour_key(text_colour),
+               self.circular_node_radius, self.node_border_width, self.node_text_padding, self.font_size) # Settings can change between redraws
+        sprite = self._surfaces.get(key)
+        if sprite is not None:
+            return sprite
+
+        text = self._text(name, text_colour)
+        width, height = text.get_size()
+        b = self.node_border_width
+
+        if self.node_shape == 'circle':
+            r = self.circular_node_radius + (b if border_colour else 0)
+            surface = pygame.Surface((2 * r + 1, 2 * r + 1), pygame.SRCALPHA)
+            if border_colour: # If no border colour is specified, assume no borders desired
+                pygame.gfxdraw.aacircle(surface, r, r, r, border_colour)
+                pygame.gfxdraw.filled_circle(surface, r, r, r, border_colour)
+
+            pygame.gfxdraw.aacircle(surface, r, r, self.circular_node_radius, colour) # Use an aacircle to avoid jagged edges
+            pygame.gfxdraw.filled_circle(surface, r, r, self.circular_node_radius, colour) # Fill into the anti-aliased border
+
+            surface.blit(text, (r - (width // 2), r - (height // 2))) # Print the node name into the center of the circle
+            offset = (-r, -r)
+        elif self.node_shape == 'square':
+            p = self.node_text_padding * 2
+            surface = pygame.Surface((width + p + 2 * b, height + p + 2 * b), pygame.SRCALPHA)
+            if border_colour: # If no border colour is specified, assume no borders desired
+                surface.fill(border_colour)
+
+            pygame.draw.rect(surface, colour, pygame.Rect(b, b, width + p, height + p))
+            surface.blit(text, (b + 5, b + 5))
+            offset = (-(width // 2) - b, -(height // 2) - b) # The name, not the box, is centred on the node
+        else:
+            return None
+
+        return self._surfaces.put(key, (surface, offset))
+
+    def scale(self): # Fit the layout to the window, resetting zoom and pan
+        self.zoom = 1
+        self.offset = (0, 0)
+        self.invalidate()
+        self.layout.scale()
+        self._grid.rebuild(self.nodes)
 
     def distribute(self, animate = True):
         self.distributing = True
-        
-        total_force = math.inf
-        prev = 0
-
-        pseudo_edges = [] # Edges that ensure lonely nodes don't get flung into the void
-        for node in self.nodes:
-            if self.degree(node) == 0:
-                if len(self.edges) == 0:
-                    pseudo_edges.append((node, random.choice(self.nodes)))
-                else:
-                    lowest_degree_nodes = []
-                    lowest_degree = math.inf
-                    for n in self.nodes:
-                        d = self.degree(n)
-                        if 0 < d < lowest_degree:
-                            lowest_degree_nodes = [n]
-                        elif d == lowest_degree:
-                            lowest_degree_nodes.append(n)
-                    pseudo_edges.append((node, random.choice(lowest_degree_nodes)))
-
-        running = True
-        while running and total_force != prev:
-            prev = total_force
-            total_force = 0
-
-            for node in self.nodes:
-                if hasattr(node, '_fixed') and node._fixed:
-                    continue
-                node._x_force = 0
-                node._y_force = 0
-                for other in self.nodes:
-                    if node != other:
-                        r_squared = ((abs(node.x - other.x) ** 2) + (abs(node.y - other.y) ** 2))
-                        if r_squared == 0:
-                            force = max(self.width, self.height) ** (1 / 2)
-                        else:
-                            force = ((min(self.width, self.height) ** 2) / len(self.nodes)) / r_squared # k * (q1*q2)/r^2, where k is 1 (coulombs law)
-                        direction = math.atan2((node.y - other.y), (node.x - other.x))
-                        node._x_force += force * math.cos(direction)
-                        node._y_force += force * math.sin(direction)
-
-                        total_force += force
-
-            for edge in self.edges + pseudo_edges:
-                if type(edge) == tuple: # Pseudo edges are tuples of (u, v)
-                    u = edge[0]
-                    v = edge[1]
-                else: # While self.edges are Edge objects
-                    u = self.nodes[edge.u]
-                    v = self.nodes[edge.v]
-                dist = ((abs(u.x - v.x) ** 2) + (abs(u.y - v.y) ** 2)) ** (1 / 2)
-                force = (-1 / len(self.nodes)) * abs((min(self.width, self.height) / 10) - dist) # Hookes law, where k is 1/|v|
-                # Scale k to avoid 'singularity' situation
-    
-                total_force += force
-
-                direction = math.atan2((u.y - v.y), (u.x - v.x))
-                
-                u._x_force += force * math.cos(direction)
-                u._y_force += force * math.sin(direction)
-                v._x_force += force * math.cos(direction + math.pi) # Add pi, as force is in opposite direction
-                v._y_force += force * math.sin(direction + math.pi)
-
-            for node in self.nodes:
-                if hasattr(node, '_fixed') and node._fixed:
-                    continue
-                node.x += int(node._x_force)
-                node.y += int(node._y_force)
-
-            if animate:
-                self.handle_pygame_events()
-                self.redraw()                
-        
+        self._last_frame = time.perf_counter()
+        self.layout.distribute(self._frame if animate else None)
+        self._grid.rebuild(self.nodes)
         self.distributing = False
 
+    def _frame(self): # Called by the layout after each step when animating
+        self._grid.rebuild(self.nodes)
+        self.handle_pygame_events()
+        self.redraw()
+        if self.profiler:
+            now = time.perf_counter()
+            self.profiler.frame(now - self._last_frame) # Includes the layout step
+            self._last_frame = now
+
+    def node_at(self, x, y): # The node drawn at screen position (x, y), if any
+        self._update_grid()
+        m = self._node_extent
+        for n in self._grid.query(*self.to_layout(x - m, y - m), *self.to_layout(x + m, y + m)):
+            n_x, n_y = self.to_screen(n.x, n.y)
+            if not self._detailed: # Drawn as a small square
+                if abs(x - n_x) <= self.lod_node_radius + 2 and abs(y - n_y) <= self.lod_node_radius + 2:
+                    return n
+            elif self.node_shape == 'square' and hasattr(n, '_x_size') and (abs(x - n_x) <= n._x_size and abs(y - n_y) <= n._y_size): # If it's a square, check if the mouse position is within it's box
+                return n
+            elif self.node_shape == 'circle' and ((x - n_x) ** 2 + (y - n_y) ** 2) ** (1 / 2) <= self.circular_node_radius: # For a circle, just check against the radius
+                return n
+        return None
+
     def handle_pygame_events(self):
+        _import_pygame()
+        t = time.perf_counter() if self.profiler else 0
+        moved = False # Whether the view has been zoomed, panned or relaxed
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 self.running = False
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1:
-                    for n in self.nodes:
-                        m_x, m_y = event.pos
-
-                        in_range = False
-                        if self.node_shape == 'square' and (abs(m_x - n.x) <= n._x_size and abs(m_y - n.y) <= n._y_size): # If it's a square, check if the mouse position is within it's box
-                            in_range = True
-                        if self.node_shape == 'circle' and ((m_x - n.x) ** 2 + (m_y - n.y) ** 2) ** (1 / 2) <= self.circular_node_radius: # For a circle, just check against the radius
-                            in_range = True
-
-                        if in_range:
-                            self.holding = n
-                            self.holding._fixed = True # While the user holds the node, fix it for redistribution
-                            self.holding_offset = ((n.x - m_x), (n.y - m_y))
-                            break
+                    n = self.node_at(*event.pos)
+                    if n is not None:
+                        m_x, m_y = self.to_layout(*event.pos)
+                        self.holding = n
+                        self.holding._fixed = True # While the user holds the node, fix it for redistribution
+                        self.holding_offset = ((n.x - m_x), (n.y - m_y))
+                        if self._worker:
+                            self._worker.fix(n.name, True)
+                    else: # Dragging the background pans
+                        self._panning = True
+            elif event.type == pygame.MOUSEWHEEL:
+                self.zoom_at(*pygame.mouse.get_pos(), self.zoom_step ** event.y)
+                moved = True
             elif event.type == pygame.MOUSEBUTTONUP:
                 if event.button == 1:
+                    self._panning = False
                     if self.holding:
                         self.holding._fixed = False
+                        if self._worker:
+                            self._worker.fix(self.holding.name, False)
                         self.holding = None
+                        if self._relax_while_dragging() and not self._worker and not self.distributing: # Full pass once the node is let go
+                            self.distribute()
                 elif event.button == 3:
+                    if self._worker: # Positions come from the worker, so it does the scaling
+                        self._worker.scale()
+                        continue
                     if not self.distributing:
                         self.distribute()
                     self.scale()
                     self.redraw()
             elif event.type == pygame.MOUSEMOTION:
-                if self.holding:                
-                    x, y = event.pos
+                if self._panning:
+                    self.pan(*event.rel)
+                    moved = True
+                elif self.holding:
+                    x, y = self.to_layout(*event.pos)
                     self.holding.x = x + self.holding_offset[0]
                     self.holding.y = y + self.holding_offset[1]
-                    if not self.distributing:
+                    self._grid.move(self.holding)
+                    if self._worker:
+                        self._worker.move(self.holding.name, self.holding.x, self.holding.y)
+                    elif self._relax_while_dragging():
+                        for name in self.layout.relax([self.holding]):
+                            self._grid.move(self._nodes[name])
+                        moved = True
+                    elif not self.distributing:
                         self.distribute()
+        if moved and not self._worker and not self.distributing: # Otherwise the next frame will show it
+            self.redraw()
+        if self.profiler:
+            self.profiler.record('events', t)
 
     def _run(self):
-        while self.running:
-            self.handle_pygame_events()
-        pygame.quit()
+        if self.background_layout:
+            self._run_background()
+        else:
+            while self.running:
+                self.handle_pygame_events()
+        self.close()
+
+    def _run_background(self): # Draw the worker's latest positions at target_fps until the window is closed
+        self._worker = _LayoutWorker(self, self.background_layout)
+        clock = pygame.time.Clock()
+        last = time.perf_counter()
+        try:
+            while self.running:
+                self.handle_pygame_events()
+                positions = self._worker.latest()
+                if positions is not None:
+                    self.invalidate() # Most nodes will have moved
+                    for n in self.nodes:
+                        if n is not self.holding and n.name in positions:
+                            n.x, n.y = positions[n.name]
+                    self._grid.rebuild(self.nodes)
+                self.redraw()
+                clock.tick(self.target_fps)
+                if self.profiler:
+                    now = time.perf_counter()
+                    self.profiler.frame(now - last)
+                    last = now
+        finally:
+            self._worker.stop()
+            self._worker = None
 
     def run(self):
         self.running = True
@@ -348,5 +786,364 @@ class DisplayGraph(Graph):
     def show(self):
         self.init_window()
 
-    def close(self):
+    def close(self): # Also stops observing the graph, which in view mode would otherwise keep this alive
+        _import_pygame()
         pygame.quit()
+        self.invalidate()
+        if self._observing:
+            self.graph.unobserve(self._changed)
+            self._observing = False
+
+    def _watch(self):
+        self.graph.observe(self._changed)
+        self._observing = True
+
+
+def export_images(jobs, workers = None, distribute = True, **kwargs):
+    # Save each (graph, path) in jobs as an image, in a pool of processes, None for one per core, 1 to stay in this process.
+    # Graphs are laid out unless not distribute, when their nodes' x and y are used as they are. kwargs are DisplayGraph settings.
+    # Returns the paths, with the exception raised in place of the path of any job that failed, so one bad graph doesn't lose the rest
+    kwargs.setdefault('layout_workers', 1) # Each job is already in its own process
+    jobs = [(graph, path, distribute, kwargs) for graph, path in jobs]
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(min(workers, len(jobs))) as pool:
+            return list(pool.map(_export_image, jobs, chunksize = max(1, len(jobs) // (workers * 4))))
+    return [_export_image(job) for job in jobs]
+
+
+def _export_image(job): # Lay out and save one graph, in a worker process
+    graph, path, distribute, kwargs = job
+    try:
+        d = DisplayGraph(graph, **kwargs)
+        if distribute:
+            d.distribute(animate = False)
+            d.scale()
+        else:
+            for n in d.nodes:
+                n.x, n.y = graph.get_node(n.name).x, graph.get_node(n.name).y
+        return d.save_image(path)
+    except Exception as e:
+        return e
+
+
+def _colour_key(colour): # Hashable form of a colour for cache keys, lists and pygame Colors aren't
+    if colour is None or type(colour) in (str, tuple):
+        return colour
+    return tuple(colour)
+
+
+def _svg_colour(colour): # Colours are RGB or RGBA sequences, or names such as 'red'
+    if type(colour) == str:
+        return escape(colour, {'"': '&quot;'})
+    r, g, b = tuple(colour)[:3]
+    return f'rgb({r},{g},{b})'
+
+
+def _svg_points(points):
+    return ' '.join(f'{x:g},{y:g}' for x, y in points)
+
+
+class _Point(): # Screen position of an edge end
+    __slots__ = ['x', 'y']
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+class _LayoutWorker(): # Runs the force simulation on a copy of a DisplayGraph in a thread or process, which publishes position snapshots
+    def __init__(self, display, kind):
+        settings = dict(display.layout._settings(), layout_components = display.layout.layout_components, layout_workers = display.layout.layout_workers)
+        if kind == 'process':
+            settings['layout_workers'] = 1 # Daemon processes can't start a pool of their own
+        job = (
+            [n.name for n in display.nodes],
+            [(e.u, e.v) for e in display.edges],
+            display.directed,
+            {n.name: (n.x, n.y) for n in display.nodes},
+            [n.name for n in display.nodes if getattr(n, '_fixed', False)],
+            display.width,
+            display.height,
+            settings,
+            1 / display.target_fps # Snapshots aren't published more often than they can be drawn
+        )
+
+        if kind == 'thread':
+            self._commands = queue.Queue()
+            self._snapshots = queue.Queue()
+            self._worker = threading.Thread(target = _layout_worker, args = (job, self._commands, self._snapshots), daemon = True)
+        elif kind == 'process': # Doesn't compete with drawing for the GIL
+            self._commands = multiprocessing.Queue()
+            self._snapshots = multiprocessing.Queue()
+            self._worker = multiprocessing.Process(target = _layout_worker, args = (job, self._commands, self._snapshots), daemon = True)
+        else:
+            raise ValueError('Acceptable values for background_layout are \'thread\' and \'process\'')
+        self._worker.start()
+
+    def latest(self): # The newest snapshot, {name: (x, y)}, or None if there hasn't been one since the last call
+        positions = None
+        while True:
+            try:
+                positions = self._snapshots.get_nowait()
+            except queue.Empty:
+                return positions
+
+    def move(self, name, x, y):
+        self._commands.put(('move', name, x, y))
+
+    def fix(self, name, fixed):
+        self._commands.put(('fix', name, fixed))
+
+    def scale(self):
+        self._commands.put(('scale',))
+
+    def stop(self):
+        self._commands.put(('stop',))
+        deadline = time.perf_counter() + 1
+        while self._worker.is_alive():
+            self.latest() # A process can't exit until its snapshots have been read
+            self._worker.join(0.05)
+            if type(self._worker) == multiprocessing.Process and time.perf_counter() > deadline:
+                self._worker.kill() # Busy in something that doesn't check for commands, e.g. laying out components. SIGTERM may be caught by SDL
+
+
+def _layout_worker(job, commands, snapshots): # Body of the background layout thread or process
+    names, edges, directed, positions, fixed, width, height, settings, interval = job
+    graph = Graph(names, directed = directed)
+    for u, v in edges: # Already validated
+        graph._index_edge(Edge(u, v))
+    for node in graph.nodes:
+        node.x, node.y = positions[node.name]
+        node._fixed = False
+    for name in fixed:
+        graph.get_node(name)._fixed = True
+    layout = Layout(graph, width, height, **settings)
+    published = 0
+
+    def run(command):
+        if command[0] == 'stop':
+            raise _Stopped()
+        elif command[0] == 'move':
+            node = graph.get_node(command[1])
+            node.x = command[2]
+            node.y = command[3]
+        elif command[0] == 'fix':
+            graph.get_node(command[1])._fixed = command[2]
+        elif command[0] == 'scale':
+            layout.scale()
+
+    def publish():
+        nonlocal published
+        snapshots.put(layout.positions())
+        published = time.perf_counter()
+
+    def frame(): # Called by the layout after each iteration
+        while True:
+            try:
+                run(commands.get_nowait())
+            except queue.Empty:
+                break
+        if time.perf_counter() - published >= interval:
+            publish()
+
+    try:
+        layout.distribute(frame)
+        while True:
+            publish()
+            run(commands.get()) # Wait for something to change before converging again
+            frame()
+            layout._converge(frame, layout.integration, min(width, height) / 80)
+    except _Stopped:
+        pass
+
+
+class _Stopped(Exception): # Raised in the layout worker to abandon the current distribution
+    pass
+
+
+class _ViewNode(): # Node of a viewed graph, display state set on it stays here and other attributes are read from the node
+    def __init__(self, node, observer = None):
+        object.__setattr__(self, 'node', node)
+        object.__setattr__(self, '_observer', observer) # Called as observer(view, key) before public display state is set
+        self._fixed = False
+
+    def __setattr__(self, key, value):
+        if self._observer is not None and key[0] != '_':
+            self._observer(self, key)
+        object.__setattr__(self, key, value)
+
+    def __getattr__(self, key): # Only called for attributes that haven't been set on the view
+        if key == 'node': # Not set yet, e.g. while unpickling
+            raise AttributeError(key)
+        return getattr(self.node, key)
+
+    def __str__(self):
+        return str(self.node)
+
+    @property
+    def name(self):
+        return self.node.name
+
+    def attributes(self): # The node's attributes, overridden by public ones set on the view
+        attrs = self.node.attributes()
+        attrs.update((k, v) for k, v in vars(self).items() if k != 'node' and not k.startswith('_'))
+        return attrs
+
+
+class _NodeOverlay(): # Stands in for a viewed graph's NodeList, returning a _ViewNode for each of its nodes
+    def __init__(self, graph, observer = None):
+        self._graph = graph
+        self._observer = observer # Given to each view
+        self._views = {} # Node -> _ViewNode
+        self._nodes = []
+        self._version = None # Graph version self._nodes was built at
+
+    @property
+    def nodes(self): # Views in node order, rebuilt when the graph changes
+        if self._version != self._graph.version:
+            self._nodes = [self._view(n) for n in self._graph.nodes]
+            self._views = {v.node: v for v in self._nodes} # Forget removed nodes
+            self._version = self._graph.version
+        return self._nodes
+
+    def __contains__(self, n):
+        return self.has_node(n)
+
+    def __len__(self):
+        return len(self._graph.nodes)
+
+    def __iter__(self):
+        return self.nodes.__iter__()
+
+    def __getitem__(self, key):
+        return self.get_node(key)
+
+    def add_node(self, node):
+        self.add_nodes([node])
+
+    def add_nodes(self, nodes): # Added to the viewed graph, returns the added Nodes
+        return self._graph._nodes.add_nodes(nodes)
+
+    def remove_node(self, node):
+        return self._graph._nodes.remove_node(self._name(node))
+
+    def has_node(self, node):
+        return self._graph._nodes.has_node(self._name(node))
+
+    def get_node(self, node):
+        n = self._graph._nodes.get_node(self._name(node))
+        return self._view(n) if n is not None else None
+
+    def _view(self, node):
+        view = self._views.get(node)
+        if view is None:
+            view = self._views[node] = _ViewNode(node, self._observer)
+        return view
+
+    @staticmethod
+    def _name(node):
+        return node.name if type(node) == _ViewNode else NodeList._name(node)
+
+
+class _SurfaceCache(): # Least recently used cache of rendered surfaces
+    def __init__(self, size):
+        self.size = size
+        self._items = OrderedDict()
+
+    def get(self, key):
+        item = self._items.get(key)
+        if item is not None:
+            self._items.move_to_end(key)
+        return item
+
+    def put(self, key, item):
+        self._items[key] = item
+        if len(self._items) > self.size:
+            self._items.popitem(last = False)
+        return item
+
+
+class _EdgeGrid(): # Uniform grid bucketing edges by the cells their bounding boxes overlap
+    max_cells = 16 # Edges overlapping more cells than this are kept aside and returned by every query
+
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self._cells = {} # (column, row) -> set of edges
+        self._where = {} # edge -> its cells, or None if it's long
+        self._boxes = {} # edge -> bounding box
+        self._long = set()
+
+    def _cells_of(self, x0, y0, x1, y1):
+        c0, r0 = int(x0 // self.cell_size), int(y0 // self.cell_size)
+        c1, r1 = int(x1 // self.cell_size), int(y1 // self.cell_size)
+        if (c1 - c0 + 1) * (r1 - r0 + 1) > self.max_cells:
+            return None
+        return [(c, r) for c in range(c0, c1 + 1) for r in range(r0, r1 + 1)]
+
+    def move(self, edge, x0, y0, x1, y1):
+        self.remove(edge)
+        self._boxes[edge] = (x0, y0, x1, y1)
+        cells = self._where[edge] = self._cells_of(x0, y0, x1, y1)
+        if cells is None:
+            self._long.add(edge)
+        else:
+            for cell in cells:
+                self._cells.setdefault(cell, set()).add(edge)
+
+    def remove(self, edge):
+        self._boxes.pop(edge, None)
+        cells = self._where.pop(edge, ())
+        if cells is None:
+            self._long.discard(edge)
+        else:
+            for cell in cells:
+                self._cells[cell].discard(edge)
+
+    def query(self, x0, y0, x1, y1): # Edges with boxes overlapping the rectangle
+        (c0, r0), (c1, r1) = (int(x0 // self.cell_size), int(y0 // self.cell_size)), (int(x1 // self.cell_size), int(y1 // self.cell_size))
+        found = set(self._long)
+        if (c1 - c0 + 1) * (r1 - r0 + 1) > len(self._cells): # Cheaper to check the occupied cells
+            for (c, r), cell in self._cells.items():
+                if c0 <= c <= c1 and r0 <= r <= r1:
+                    found.update(cell)
+        else:
+            for c in range(c0, c1 + 1):
+                for r in range(r0, r1 + 1):
+                    found.update(self._cells.get((c, r), ()))
+        boxes = self._boxes
+        return [e for e in found if boxes[e][0] <= x1 and boxes[e][2] >= x0 and boxes[e][1] <= y1 and boxes[e][3] >= y0]
+
+
+class _SpatialGrid(): # Uniform grid bucketing nodes by position
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self._cells = {} # (column, row) -> list of nodes
+        self._where = {} # node -> (column, row)
+
+    def _cell(self, x, y):
+        return (int(x // self.cell_size), int(y // self.cell_size))
+
+    def rebuild(self, nodes):
+        self._cells = {}
+        self._where = {}
+        for n in nodes:
+            cell = self._cell(n.x, n.y)
+            self._cells.setdefault(cell, []).append(n)
+            self._where[n] = cell
+
+    def move(self, node):
+        cell = self._cell(node.x, node.y)
+        old = self._where.get(node)
+        if old == cell:
+            return
+        if old is not None:
+            self._cells[old].remove(node)
+        self._cells.setdefault(cell, []).append(node)
+        self._where[node] = cell
+
+    def query(self, x0, y0, x1, y1): # Nodes in cells overlapping the rectangle, may include some just outside it
+        (c0, r0), (c1, r1) = self._cell(x0, y0), self._cell(x1, y1)
+        if (c1 - c0 + 1) * (r1 - r0 + 1) > len(self._cells): # Cheaper to check the occupied cells
+            return [n for (c, r), cell in self._cells.items() if c0 <= c <= c1 and r0 <= r <= r1 for n in cell]
+        return [n for c in range(c0, c1 + 1) for r in range(r0, r1 + 1) for n in self._cells.get((c, r), ())]
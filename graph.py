@@ -1,35 +1,124 @@
+import math # Geometric skip sampling
+import random # Random graph generation
+from array import array # Compact storage for frozen graphs
+from bisect import bisect_left # Edge lookup in sorted adjacency rows
+import json # Frozen graph file header
+import mmap # Load frozen graphs without copying
+import struct # Frozen graph file header
+import sys # Byte order of frozen graph files
+
 class Graph():
     def __init__(self, nodes = None, edges = None, directed = False):
         self._nodes = NodeList(nodes) if nodes is not None else NodeList([]) # NodeList is more flexible than a list
         
         self.directed = directed
-        self.edges = []
-        if type(edges)==list: # edges is a list of edges
-            for edge in edges:
-                self.add_edge(edge)
-        elif type(edges) in [float, int] and 0 <= edges <= 1: # edges is the probability that a given edge exists ([0, 1])
-            from random import random
-
-            failed = [] # ensure an undirected graph doesn't contain (u, v) and (v, u)
-            for u in self._nodes:
-                for v in self._nodes:
-                    if u == v:
-                        continue
-
-                    edge = (u.name, v.name)
-                    if random() <= edges and not edge in failed and not self.has_edge(edge):
-                        self.add_edge(edge)
-                    else:
-                        failed.append((u.name, v.name))
-                        if not self.directed: # (u, v) and (v, u) are different in a directed graph
-                            failed.append((v.name, u.name)) # but the same in an undirected graph
+        self.version = 0 # Incremented on every change to the nodes or edges, so derived results can be invalidated
+        self._observers = () # See observe
+        self.edges = [] # Removing an edge moves the last edge into its place
+        self._edge_index = None # Edge -> position in edges, so removal doesn't have to search it, built by the first removal
+        self._out = {n.name: {} for n in self._nodes} # Adjacency index, node name -> {neighbour name: Edge}
+        self._in = {n.name: {} for n in self._nodes} if directed else self._out # Undirected edges are indexed in both directions
+        if type(edges) in [float, int]:
+            if 0 <= edges <= 1: # edges is the probability that a given edge exists ([0, 1])
+                self._add_random_edges(edges, random.Random())
+        elif edges is not None: # edges is an iterable of edges
+            self.add_edges(edges)
+
+    @staticmethod
+    def random(n, p, directed = False, seed = None): # G(n, p): each possible edge exists with probability p
+        g = Graph(n, directed = directed)
+        g._add_random_edges(p, random.Random(seed))
+        return g
+
+    @staticmethod
+    def random_with_edges(n, m, directed = False, seed = None): # G(n, m): m edges chosen uniformly at random
+        g = Graph(n, directed = directed)
+        names = [node.name for node in g.nodes]
+        possible = n * (n - 1) if directed else n * (n - 1) // 2
+        if not 0 <= m <= possible:
+            raise ValueError(f'A graph with {n} nodes can have between 0 and {possible} edges.')
+
+        for k in random.Random(seed).sample(range(possible), m): # Sample edge indices, decode them to pairs
+            u, v = g._pair_from_index(k, n)
+            g._index_edge(Edge(names[u], names[v]))
+        return g
+
+    @staticmethod
+    def barabasi_albert(n, m, seed = None): # Preferential attachment: each new node joins m existing nodes
+        if not 1 <= m < n:
+            raise ValueError(f'Each new node must attach to between 1 and {n - 1} nodes.')
+
+        rng = random.Random(seed)
+        g = Graph(n)
+        targets = list(range(m))
+        repeated = [] # Each node appears once per edge it has, so choice() is weighted by degree
+        for source in range(m, n):
+            for target in targets:
+                g._index_edge(Edge(source, target))
+            repeated.extend(targets)
+            repeated.extend([source] * m)
+
+            chosen = set()
+            while len(chosen) < m:
+                chosen.add(rng.choice(repeated))
+            targets = list(chosen)
+        return g
+
+    @staticmethod
+    def random_geometric(n, radius, seed = None): # Nodes placed in the unit square, joined if within radius
+        rng = random.Random(seed)
+        g = Graph([{'name': i, 'pos': (rng.random(), rng.random())} for i in range(n)])
+
+        cells = {} # Bucket nodes into a grid of radius sized cells, so only adjacent cells are compared
+        for node in g.nodes:
+            x, y = node.pos
+            cells.setdefault((int(x / radius), int(y / radius)), []).append(node)
+
+        r_squared = radius ** 2
+        for (cx, cy), bucket in cells.items():
+            for node in bucket:
+                x, y = node.pos
+                for dx in (-1, 0, 1):
+                    for dy in (-1, 0, 1):
+                        for other in cells.get((cx + dx, cy + dy), []):
+                            if other.name <= node.name: # Consider each pair once
+                                continue
+                            if (x - other.pos[0]) ** 2 + (y - other.pos[1]) ** 2 <= r_squared:
+                                g._index_edge(Edge(node.name, other.name))
+        return g
 
     @property
     def nodes(self):
         return self._nodes.nodes
 
     def add_node(self, node):
-        self._nodes.add_node(node)
+        self.add_nodes([node])
+
+    def add_nodes(self, nodes):
+        for n in self._nodes.add_nodes(nodes):
+            self._out[n.name] = {}
+            self._in[n.name] = {}
+            self.version += 1
+            for observer in self._observers:
+                n._observe(observer)
+        self._notify('nodes')
+
+    def remove_node(self, node):
+        n = self._nodes[node]
+        if n is None:
+            raise ValueError(f'Node {node} is not in the graph.')
+
+        for edge in self.get_neighbour_edges(n):
+            self._unindex_edge(edge)
+
+        del self._out[n.name]
+        self._in.pop(n.name, None) # Already removed for undirected graphs
+        self._nodes.remove_node(n)
+        self.version += 1 # After removing it, so anything an observer derives at this version is without it
+        for observer in self._observers:
+            n._unobserve(observer)
+        self._notify('nodes')
+        return n
 
     def has_node(self, node):
         return node in self._nodes
@@ -40,39 +129,35 @@ class Graph():
     def get_neighbours(self, node):
         n = self._nodes[node].name # If node is not the name, get the name
 
-        neighbours = []
-        for edge in self.edges:
-            if n in [edge.u, edge.v]:
-                if n == edge.u:
-                    neighbours.append(self._nodes[edge.v])
-                elif n == edge.v:
-                    neighbours.append(self._nodes[edge.u])
-
+        neighbours = [self._nodes[v] for v in self._out[n]]
+        if self.directed:
+            neighbours.extend(self._nodes[u] for u in self._in[n] if u != n) # Self loops are already counted
+        
         return neighbours
 
     def get_neighbour_edges(self, node):
         n = self._nodes[node].name # If node is not the name, get the name
 
-        neighbour_edges = []
-        for edge in self.edges:
-            if n in [edge.u, edge.v]:
-                neighbour_edges.append(edge)
+        neighbour_edges = list(self._out[n].values())
+        if self.directed:
+            neighbour_edges.extend(e for u, e in self._in[n].items() if u != n)
         
         return neighbour_edges
 
+    def successors(self, node): # (neighbour name, Edge) for each edge that can be followed from node
+        return self._out[self._nodes[node].name].items()
+
+    def predecessors(self, node): # (neighbour name, Edge) for each edge that can be followed to node
+        return self._in[self._nodes[node].name].items()
+
     def degree(self, node, direction = None):
         n = self._nodes[node].name
         
-        degree = 0
         if self.directed and direction:
             if direction.lower() == 'in':
-                for edge in self.edges:
-                    if n == edge.v:
-                        degree += 1
+                degree = len(self._in[n])
             elif direction.lower() == 'out':
-                for edge in self.edges:
-                    if n == edge.u:
-                        degree += 1
+                degree = len(self._out[n])
             else:
                 raise ValueError('Acceptable directions for degree are \'in\' and \'out\'')
         else:
@@ -81,12 +166,98 @@ class Graph():
         return degree
 
     def add_edge(self, edge):
-        if self.has_edge(edge):
-            raise ValueError('Each edge in a graph must be unique.')
-
-        if type(edge) == Edge:
+        self.add_edges([edge])
+
+    def add_edges(self, edges): # Validate the whole batch before adding any of it
+        batch = []
+        seen = set() # Keys of edges earlier in the batch
+        for edge in edges:
+            edge = self._parse_edge(edge)
+            key = (edge.u, edge.v)
+            if key in seen or self.has_edge(key):
+                raise ValueError('Each edge in a graph must be unique.')
+
+            seen.add(key)
+            if not self.directed:
+                seen.add((edge.v, edge.u))
+            batch.append(edge)
+
+        for edge in batch:
+            self._index_edge(edge)
+
+    def ingest(self, edges, chunk_size = 10000, create_nodes = False, duplicates = 'skip', progress = None):
+        # Stream edges in from any iterable, including an open edge list file of 'u v' lines, a chunk at a time.
+        # Missing endpoints are created if create_nodes, duplicates can be 'skip'ped or raise an 'error'.
+        # progress(items read, edges added) is called after each chunk. Returns the number of edges added.
+        if duplicates not in ['skip', 'error']:
+            raise ValueError('Acceptable values for duplicates are \'skip\' and \'error\'')
+
+        read = added = 0
+        chunk = []
+        for edge in edges:
+            chunk.append(edge)
+            if len(chunk) >= chunk_size:
+                added += self._ingest_chunk(chunk, create_nodes, duplicates)
+                read += len(chunk)
+                chunk.clear()
+                if progress:
+                    progress(read, added)
+        if chunk:
+            added += self._ingest_chunk(chunk, create_nodes, duplicates)
+            read += len(chunk)
+            if progress:
+                progress(read, added)
+
+        return added
+
+    def _ingest_chunk(self, chunk, create_nodes, duplicates):
+        batch = []
+        seen = set() # Keys of edges earlier in the chunk
+        missing = {} # Endpoints to create, in the order they were seen
+        for edge in chunk:
+            if type(edge) == str: # Line of an edge list, parsed as storage.read_edge_list does
+                edge = _parse_edge_line(edge)
+                if edge is None:
+                    continue
+                edge = Edge(edge['u'], edge['v'])
+            elif type(edge) in [tuple, list]:
+                if len(edge) != 2:
+                    raise ValueError(f'An edge connects 2 nodes, therefore {edge} is inadmissable. To add other args, use a dict.')
+                edge = Edge(edge[0], edge[1])
+            elif type(edge) == dict:
+                if 'u' not in edge or 'v' not in edge:
+                    raise ValueError(f'A dict must contain a key \'u\' and a key \'v\', nodes in the graph. {edge} is not admissable.')
+                edge = Edge(**edge)
+            elif not isinstance(edge, Edge):
+                raise TypeError(f'Type {type(edge)} is inadmissable as an edge.')
+
+            for n in [edge.u, edge.v]:
+                if n not in self._out:
+                    if not create_nodes:
+                        raise ValueError(f'An edge must be between two nodes in the graph.')
+                    missing[n] = None
+
+            key = (edge.u, edge.v)
+            if key in seen or self.has_edge(key):
+                if duplicates == 'error':
+                    raise ValueError('Each edge in a graph must be unique.')
+                continue
+
+            seen.add(key)
+            if not self.directed:
+                seen.add((edge.v, edge.u))
+            batch.append(edge)
+
+        if missing:
+            self.add_nodes(missing)
+        for edge in batch:
+            self._index_edge(edge)
+        return len(batch)
+
+    def _parse_edge(self, edge): # Convert an admissable edge form to an Edge between nodes in the graph
+        if isinstance(edge, Edge):
             if self.has_node(edge.u) and self.has_node(edge.v):
-                self.edges.append(edge)
+                return edge
             else:
                 raise ValueError(f'An edge must be between two nodes in the graph.')
         elif type(edge) in [tuple, list]:
@@ -94,38 +265,76 @@ class Graph():
                 raise ValueError(f'An edge connects 2 nodes, therefore {edge} is inadmissable. To add other args, use a dict.')
             else:
                 if self.has_node(edge[0]) and self.has_node(edge[1]):
-                    self.edges.append(Edge(edge[0], edge[1]))
+                    return Edge(edge[0], edge[1])
                 else:
                     raise ValueError(f'An edge must be between two nodes in the graph.')
         elif type(edge) == dict:
             if self.has_node(edge.get('u')) and self.has_node(edge.get('v')):
-                self.edges.append(Edge(**edge))
+                return Edge(**edge)
             else:
                 raise ValueError(f'A dict must contain a key \'u\' and a key \'v\', nodes in the graph. {edge} is not admissable.')
         else:
             raise TypeError(f'Type {type(edge)} is inadmissable as an edge.')
 
-    def has_edge(self, edge):
-        if not self.edges:
-            return False
+    def remove_edge(self, edge):
+        e = self.get_edge(edge)
+        if e is None:
+            raise ValueError(f'Edge {edge} is not in the graph.')
 
-        if self.directed:
-            edges = [(e.u, e.v) for e in self.edges]
-        else:
-            edges = [(e.u, e.v) for e in self.edges]
-            edges.extend([(e.v, e.u) for e in self.edges])
-        
-        if type(edge) == Edge:
-            return (edge.u, edge.v) in edges
-        elif type(edge) in [tuple, list]:
-            return tuple(edge) in edges
-        elif type(edge) == dict:
-            return (edge.get('u'), edge.get('v')) in edges
-        else:
-            raise TypeError(f'Type {type(edge)} is inadmissable as an edge.')
+        self._unindex_edge(e)
+        return e
+
+    def has_edge(self, edge):
+        return self.get_edge(edge) is not None
 
     def get_edge(self, edge):
-        if type(edge) == Edge:
+        t_edge = self._edge_tuple(edge)
+        if t_edge is None:
+            return None
+
+        u, v = t_edge
+        try:
+            return self._out.get(u, {}).get(v)
+        except TypeError: # Unhashable endpoint, can't be in the graph
+            return None
+
+    def observe(self, observer):
+        # observer(item, key) is called just before public attribute key of a node or edge in the graph is set,
+        # so the old value can still be read, and observer(graph, 'nodes' or 'edges') after any are added or removed
+        self._observers += (observer,)
+        for item in self.nodes:
+            item._observe(observer)
+        for item in self.edges:
+            item._observe(observer)
+
+    def unobserve(self, observer):
+        if observer not in self._observers:
+            raise ValueError(f'{observer} is not observing the graph.')
+
+        self._observers = tuple(o for o in self._observers if o != observer)
+        for item in self.nodes:
+            item._unobserve(observer)
+        for item in self.edges:
+            item._unobserve(observer)
+
+    def __getstate__(self): # Observers aren't copied or pickled along with the graph
+        state = self.__dict__.copy()
+        state['_observers'] = ()
+        return state
+
+    def freeze(self):
+        return FrozenGraph(self)
+
+    def save(self, path): # See FrozenGraph.save
+        self.freeze().save(path)
+
+    @staticmethod
+    def load(path):
+        return FrozenGraph.load(path).thaw()
+
+    @staticmethod
+    def _edge_tuple(edge): # Reduce any of the admissable edge forms to (u, v), or None if it can't be an edge
+        if isinstance(edge, Edge):
             t_edge = (edge.u, edge.v)
         elif type(edge) in [tuple, list]:
             t_edge = tuple(edge)
@@ -133,20 +342,134 @@ class Graph():
             t_edge = (edge.get('u'), edge.get('v'))
         else:
             raise TypeError(f'Type {type(edge)} is inadmissable as an edge.')
-        
-        if self.directed:
-            for e in self.edges:
-                if (e.u, e.v) == t_edge:
-                    return e
+
+        return t_edge if len(t_edge) == 2 else None
+
+    def _index_edge(self, edge):
+        self.version += 1
+        if self._edge_index is not None:
+            self._edge_index[edge] = len(self.edges)
+        self.edges.append(edge)
+        self._out[edge.u][edge.v] = edge
+        self._in[edge.v][edge.u] = edge # For undirected graphs _in is _out, so this adds (v, u)
+        if self._observers:
+            for observer in self._observers:
+                edge._observe(observer)
+            self._notify('edges')
+
+    def _unindex_edge(self, edge):
+        self.version += 1
+        if self._edge_index is None:
+            self._edge_index = {e: i for i, e in enumerate(self.edges)}
+        i = self._edge_index.pop(edge)
+        last = self.edges.pop()
+        if last is not edge: # Fill the gap with the last edge
+            self.edges[i] = last
+            self._edge_index[last] = i
+        self._out[edge.u].pop(edge.v, None)
+        self._in[edge.v].pop(edge.u, None)
+        if self._observers:
+            for observer in self._observers:
+                edge._unobserve(observer)
+            self._notify('edges')
+
+    def _notify(self, key): # Nodes or edges were added or removed
+        for observer in self._observers:
+            observer(self, key)
+
+    def _add_random_edges(self, p, rng):
+        names = [n.name for n in self._nodes]
+        n = len(names)
+        possible = n * (n - 1) if self.directed else n * (n - 1) // 2
+
+        if p <= 0 or n < 2:
+            return
+        if p >= 1:
+            indices = range(possible)
         else:
-            for e in self.edges:
-                if t_edge in [(e.u, e.v), (e.v, e.u)]:
-                    return e
+            indices = self._skip_sample(possible, p, rng)
+
+        for k in indices:
+            u, v = self._pair_from_index(k, n)
+            edge = (names[u], names[v])
+            if not self.has_edge(edge): # Edges may already have been added by the caller
+                self._index_edge(Edge(*edge))
+
+    @staticmethod
+    def _skip_sample(possible, p, rng): # Yield indices in range(possible), each with probability p
+        log_q = math.log(1 - p)
+        k = -1
+        while True:
+            k += 1 + int(math.log(1 - rng.random()) / log_q) # Geometric gap to the next chosen index
+            if k >= possible:
+                return
+            yield k
+
+    def _pair_from_index(self, k, n): # Map an index in [0, possible edges) to a node index pair
+        if self.directed: # Row u holds the n - 1 edges (u, v) with v != u
+            u, v = divmod(k, n - 1)
+            return u, v + (v >= u)
+        else: # Lower triangle, row v holds the edges (v, 0) ... (v, v - 1)
+            v = (1 + math.isqrt(1 + 8 * k)) // 2
+            return v, k - v * (v - 1) // 2
+
+
+if hasattr(object, '__getstate__'): # Python 3.11+
+    def _item_dict(item): # An item's __dict__, or None if it has none. Reading __dict__ would create an empty one
+        state = object.__getstate__(item)
+        return state[0] if type(state) == tuple else state
+else:
+    def _item_dict(item):
+        return item.__dict__
+
+
+class _Item(): # Base of Node and Edge. Core fields are slots, other attributes go in __dict__ as usual
+    __slots__ = ['__dict__'] # While observed, __dict__ also holds _observers, a tuple of callables, see Graph.observe
+    _public = [] # Slots other than the core ones that are included in attributes()
+
+    def attributes(self): # User attributes and set public layout fields, excluding core fields
+        attrs = {k: getattr(self, k) for k in self._public if hasattr(self, k)}
+        attrs.update(_item_dict(self) or ())
+        attrs.pop('_observers', None)
+        return attrs
+
+    def _observe(self, observer): # Observed items switch to a subclass which reports changes, so unobserved ones don't pay for it
+        if isinstance(self, _Observed):
+            self._observers += (observer,)
+        else:
+            self._observers = (observer,)
+            self.__class__ = self._observed
 
-        return None
+    def _unobserve(self, observer):
+        if not isinstance(self, _Observed):
+            return
+        self._observers = tuple(o for o in self._observers if o != observer)
+        if not self._observers:
+            del self._observers
+            self.__class__ = self._base
+
+    def __reduce_ex__(self, protocol): # Copies and pickles are of the unobserved class, without observers
+        slots = {k: getattr(self, k) for k in self._base.__slots__ if hasattr(self, k)}
+        attrs = _item_dict(self)
+        if attrs is not None:
+            attrs = {k: v for k, v in attrs.items() if k != '_observers'}
+        return (_new, (self._base,), (attrs, slots))
 
 
-class Node():
+class _Observed(): # Mixed into the classes of observed items
+    __slots__ = []
+
+    def __setattr__(self, key, value):
+        if key[0] != '_': # Private fields are layout scratch space
+            for observer in self._observers:
+                observer(self, key)
+        object.__setattr__(self, key, value)
+
+
+class Node(_Item):
+    __slots__ = ['name', 'x', 'y', '_x_force', '_y_force', '_x_size', '_y_size', '_fixed'] # Layout fields are used by DisplayGraph
+    _public = ['x', 'y']
+
     def __init__(self, name, **kwargs):
         self.name = name
         for arg in kwargs:
@@ -163,12 +486,11 @@ class Node():
 class NodeList():
     def __init__(self, nodes):
         self.nodes = []
-        if type(nodes) == list:
-            for node in nodes:
-                self.add_node(node)
-        elif type(nodes) == int:
-            for i in range(nodes):
-                self.add_node(i)
+        self._index = {} # Map of name -> Node, kept in sync with self.nodes for constant time lookup
+        if type(nodes) == int:
+            self.add_nodes(range(nodes))
+        else: # nodes is an iterable of nodes
+            self.add_nodes(nodes)
 
     def __contains__(self, n):
         return self.has_node(n)
@@ -183,52 +505,68 @@ class NodeList():
         return self.get_node(key)
 
     def add_node(self, node):
-        if self.has_node(node):
-            raise ValueError('Each node in a graph must be unique.')
+        self.add_nodes([node])
 
-        if type(node) in [str, int, float]:
-            self.nodes.append(Node(node))
-        elif type(node) == Node:
+    def add_nodes(self, nodes): # Validate the whole batch before adding any of it, returns the added Nodes
+        batch = []
+        seen = set() # Names of nodes earlier in the batch
+        for node in nodes:
+            node = self._parse_node(node)
+            if node.name in seen or node.name in self._index:
+                raise ValueError('Each node in a graph must be unique.')
+
+            seen.add(node.name)
+            batch.append(node)
+
+        for node in batch:
             self.nodes.append(node)
+            self._index[node.name] = node
+        return batch
+
+    @staticmethod
+    def _parse_node(node): # Convert an admissable node form to a Node
+        if type(node) in [str, int, float]:
+            return Node(node)
+        elif isinstance(node, Node):
+            return node
         elif type(node) == dict:
             if type(node.get('name')) in [str, int, float]:
-                self.nodes.append(Node(**node))
+                return Node(**node)
             else:
                 raise ValueError(f'A dict must contain a key \'name\', a str, int or float.')
         else:
             raise TypeError(f'Type {type(node)} can\'t be parsed as a node.')
 
+    def remove_node(self, node):
+        n = self.get_node(node)
+        if n is None:
+            raise ValueError(f'Node {node} is not in the graph.')
+
+        del self._index[n.name]
+        self.nodes.remove(n)
+        return n
 
     def has_node(self, node):
-        if type(node) == Node:
-            return node in self.nodes
-        elif type(node) in [str, int, float]:
-            return node in [n.name for n in self.nodes]
-        elif type(node) == dict:
-            return node.get('name') in [n.name for n in self.nodes]
-        else:
-            raise TypeError(f'Type {type(node)} is inadmissable as a node.')
+        return self._name(node) in self._index
 
     def get_node(self, node):
-        if type(node) == Node:
-            for n in self.nodes:
-                if n.name == node.name:
-                    return n
+        return self._index.get(self._name(node))
+
+    @staticmethod
+    def _name(node): # Reduce any of the admissable node forms to the node's name
+        if isinstance(node, Node):
+            return node.name
         elif type(node) in [str, int, float]:
-            for n in self.nodes:
-                if n.name == node:
-                    return n
+            return node
         elif type(node) == dict:
-            name = node.get('name')
-            if name is not None:
-                for n in self.nodes:
-                    if n.name == name:
-                        return n
+            return node.get('name')
         else:
             raise TypeError(f'Type {type(node)} is inadmissable as a node.')
 
 
-class Edge():
+class Edge(_Item):
+    __slots__ = ['u', 'v']
+
     def __init__(self, u, v, **kwargs):
         self.u = u
         self.v = v
@@ -250,3 +588,251 @@ class Edge():
     @property
     def b(self): # Backward compatability
         return self.v
+
+
+class _ObservedNode(_Observed, Node):
+    __slots__ = []
+
+
+class _ObservedEdge(_Observed, Edge):
+    __slots__ = []
+
+
+Node._base, Node._observed = Node, _ObservedNode # Unobserved and observed classes
+Edge._base, Edge._observed = Edge, _ObservedEdge
+
+
+def _new(cls): # Copies and unpickles nodes and edges
+    return cls.__new__(cls)
+
+
+class FrozenGraph(): # Immutable snapshot of a Graph, with adjacency stored as compressed sparse rows
+    def __init__(self, graph):
+        self.directed = graph.directed
+        self._names = [n.name for n in graph.nodes] # Dense id -> name
+        self._ids = {name: i for i, name in enumerate(self._names)} # name -> dense id
+        self._node_attrs = {} # Only nodes with attributes beyond their name are stored
+        for i, n in enumerate(graph.nodes):
+            attrs = n.attributes()
+            if attrs:
+                self._node_attrs[i] = attrs
+
+        self._u = array('q', (self._ids[e.u] for e in graph.edges)) # Edge id -> endpoint ids
+        self._v = array('q', (self._ids[e.v] for e in graph.edges))
+        attrs = [e.attributes() for e in graph.edges]
+        keys = {}.fromkeys(k for a in attrs for k in a) # Ordered union of attribute names
+        self._columns = {k: _column([a.get(k, _missing) for a in attrs]) for k in keys}
+
+        self._out_offsets, self._out_targets, self._out_edges = self._csr(self._u, self._v)
+        if self.directed:
+            self._in_offsets, self._in_targets, self._in_edges = self._csr(self._v, self._u)
+        else:
+            self._in_offsets, self._in_targets, self._in_edges = self._out_offsets, self._out_targets, self._out_edges
+
+    @property
+    def nodes(self):
+        return [self._node(i) for i in range(len(self._names))]
+
+    @property
+    def edges(self):
+        return [self._edge(k) for k in range(len(self._u))]
+
+    def has_node(self, node):
+        return NodeList._name(node) in self._ids
+
+    def get_node(self, node):
+        i = self._ids.get(NodeList._name(node))
+        return self._node(i) if i is not None else None
+
+    def get_neighbours(self, node): # Ordered by node id rather than as in Graph, see _incident
+        return [self._node(self._v[k] if self._u[k] == i else self._u[k]) for i, k in self._incident(node)]
+
+    def get_neighbour_edges(self, node):
+        return [self._edge(k) for _, k in self._incident(node)]
+
+    def degree(self, node, direction = None):
+        i = self._ids[NodeList._name(node)]
+
+        if self.directed and direction:
+            if direction.lower() == 'in':
+                return self._in_offsets[i + 1] - self._in_offsets[i]
+            elif direction.lower() == 'out':
+                return self._out_offsets[i + 1] - self._out_offsets[i]
+            else:
+                raise ValueError('Acceptable directions for degree are \'in\' and \'out\'')
+        
+        return len(self._incident(node))
+
+    def has_edge(self, edge):
+        return self._find(edge) is not None
+
+    def get_edge(self, edge):
+        k = self._find(edge)
+        return self._edge(k) if k is not None else None
+
+    _magic = b'GRPH'
+    _arrays = ['_u', '_v', '_out_offsets', '_out_targets', '_out_edges', '_in_offsets', '_in_targets', '_in_edges']
+
+    def save(self, path): # Binary format: magic, header length, JSON header, then 8 byte aligned arrays
+        arrays = {name: getattr(self, name) for name in self._arrays if self.directed or not name.startswith('_in')}
+        columns = {} # Typed columns are stored as arrays, others in the header
+        for key, column in self._columns.items():
+            if type(column) == list:
+                columns[key] = [[k, v] for k, v in enumerate(column) if v is not _missing]
+            else:
+                arrays['column:' + key] = column
+
+        sections = {}
+        offset = 0
+        for name, data in arrays.items():
+            data = memoryview(data)
+            sections[name] = [offset, data.nbytes, data.format]
+            offset += -(-data.nbytes // 8) * 8
+
+        header = json.dumps({
+            'byteorder': sys.byteorder,
+            'columns': columns,
+            'directed': self.directed,
+            'names': self._names,
+            'node_attrs': [[i, attrs] for i, attrs in self._node_attrs.items()],
+            'sections': sections
+        }).encode()
+        header += b' ' * (-(len(self._magic) + 8 + len(header)) % 8) # Align the arrays
+
+        with open(path, 'wb') as f:
+            f.write(self._magic + struct.pack('<Q', len(header)) + header)
+            for name, data in arrays.items():
+                data = memoryview(data).cast('B')
+                f.write(data)
+                f.write(b'\0' * (-len(data) % 8))
+
+    @staticmethod
+    def load(path): # Arrays are views of the memory mapped file rather than copies
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+
+        if mapped[:len(FrozenGraph._magic)] != FrozenGraph._magic:
+            raise ValueError(f'{path} is not a frozen graph file.')
+        start = len(FrozenGraph._magic) + 8
+        header_length, = struct.unpack('<Q', mapped[len(FrozenGraph._magic):start])
+        header = json.loads(mapped[start:start + header_length])
+        if header['byteorder'] != sys.byteorder:
+            raise ValueError(f'{path} was saved on a machine with a different byte order.')
+
+        g = FrozenGraph.__new__(FrozenGraph)
+        g._mmap = mapped # Keep the mapping open as long as the graph
+        g.directed = header['directed']
+        g._names = header['names']
+        g._ids = {name: i for i, name in enumerate(g._names)}
+        g._node_attrs = {i: attrs for i, attrs in header['node_attrs']}
+
+        view = memoryview(mapped)
+        start += header_length
+        arrays = {name: view[start + offset:start + offset + size].cast(typecode) for name, (offset, size, typecode) in header['sections'].items()}
+        for name in FrozenGraph._arrays:
+            setattr(g, name, arrays.get(name) if name in arrays else arrays[name.replace('_in', '_out')]) # Undirected graphs share rows
+
+        g._columns = {}
+        for key, values in header['columns'].items():
+            column = [_missing] * len(g._u)
+            for k, v in values:
+                column[k] = v
+            g._columns[key] = column
+        for name, data in arrays.items():
+            if name.startswith('column:'):
+                g._columns[name[len('column:'):]] = data
+        return g
+
+    def thaw(self): # Convert back into a mutable Graph
+        g = Graph([{'name': name, **self._node_attrs.get(i, {})} for i, name in enumerate(self._names)], directed = self.directed)
+        for k in range(len(self._u)):
+            g._index_edge(self._edge(k))
+        return g
+
+    def _csr(self, sources, targets): # Build offsets, sorted targets and edge ids for each source row
+        rows = [[] for _ in self._names]
+        for k in range(len(sources)):
+            rows[sources[k]].append((targets[k], k))
+            if not self.directed and sources[k] != targets[k]: # Undirected edges appear in both rows
+                rows[targets[k]].append((sources[k], k))
+
+        offsets, row_targets, row_edges = array('q', [0]), array('q'), array('q')
+        for row in rows:
+            row.sort()
+            row_targets.extend(t for t, _ in row)
+            row_edges.extend(k for _, k in row)
+            offsets.append(len(row_targets))
+        return offsets, row_targets, row_edges
+
+    def _incident(self, node): # (node id, edge id) for each edge on node. Outgoing edges come first as in Graph, but each
+        # row is sorted by neighbour id for _find, not in the order the edges were added, so neighbours can be ordered differently
+        i = self._ids[NodeList._name(node)]
+
+        incident = [(i, self._out_edges[j]) for j in range(self._out_offsets[i], self._out_offsets[i + 1])]
+        if self.directed:
+            incident.extend((i, self._in_edges[j]) for j in range(self._in_offsets[i], self._in_offsets[i + 1]) if self._in_targets[j] != i)
+        return incident
+
+    def _find(self, edge):
+        t_edge = Graph._edge_tuple(edge)
+        if t_edge is None:
+            return None
+
+        try:
+            u, v = self._ids.get(t_edge[0]), self._ids.get(t_edge[1])
+        except TypeError: # Unhashable endpoint, can't be in the graph
+            return None
+        if u is None or v is None:
+            return None
+
+        lo, hi = self._out_offsets[u], self._out_offsets[u + 1]
+        j = bisect_left(self._out_targets, v, lo, hi)
+        if j < hi and self._out_targets[j] == v:
+            return self._out_edges[j]
+        return None
+
+    def _node(self, i):
+        return Node(self._names[i], **self._node_attrs.get(i, {}))
+
+    def _edge(self, k):
+        attrs = {}
+        for key, column in self._columns.items():
+            if column[k] is not _missing:
+                attrs[key] = column[k]
+        return Edge(self._names[self._u[k]], self._names[self._v[k]], **attrs)
+
+
+def _parse_value(value): # Read a name or value from text as an int or float if it looks like one
+    for t in [int, float]:
+        try:
+            return t(value)
+        except ValueError:
+            pass
+    return value
+
+
+def _parse_edge_line(line, attrs = ()): # Edge dict from an edge list line, u v then the values of attrs, or None if there's no edge on it
+    fields = line.split('#', 1)[0].split() # Allow comments
+    if not fields:
+        return None
+    if len(fields) < 2:
+        raise ValueError(f'An edge list line needs two nodes, {line.strip()} is inadmissable.')
+
+    edge = {'u': _parse_value(fields[0]), 'v': _parse_value(fields[1])}
+    for a, value in zip(attrs, fields[2:]):
+        edge[a] = _parse_value(value)
+    return edge
+
+
+_missing = object() # Placeholder in attribute columns for edges without that attribute
+
+
+def _column(values): # Store an attribute column as a typed array where possible
+    if all(type(v) == int for v in values):
+        try:
+            return array('q', values)
+        except OverflowError:
+            pass
+    elif all(type(v) in [int, float] for v in values):
+        return array('d', values)
+    return values
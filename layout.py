@@ -0,0 +1,675 @@
+from graph import Graph # Components are laid out as separate graphs
+import algorithms # Connected components
+from concurrent.futures import ProcessPoolExecutor # Lay out components in parallel
+import math # Distibrution, calculations
+import os # Number of cores
+import random # Create pseudo-edges to random node
+import time # Profiling
+
+numpy = None # Vectorised layout engine, optional, imported on first use as it's slow to load
+_numpy_missing = False
+
+def _import_numpy(): # Returns None if numpy isn't installed
+    global numpy, _numpy_missing
+    if numpy is None and not _numpy_missing:
+        try:
+            import numpy
+        except ImportError:
+            _numpy_missing = True
+    return numpy
+
+class Layout(): # Force directed layout, independent of pygame so positions can be computed headlessly
+    barnes_hut_theta = 0.5 # Accuracy of barnes_hut repulsion, smaller is more accurate, 0 is exact
+    barnes_hut_threshold = 200 # Number of nodes above which 'auto' repulsion uses barnes_hut
+    cooling = 0.9 # Adaptive integration multiplies the step by this when the energy rises, and divides by it after 5 decreases
+    integration = 'unit' # How nodes move each iteration: can be 'unit' (by their force, truncated), 'adaptive' (by a cooled step, as floats)
+    layout_chunk_size = 2 ** 20 # Maximum number of node pairs the numpy engine holds in memory at once
+    layout_components = False # Lay out each connected component separately, then pack them into the area
+    layout_workers = None # Processes used to lay out components, None for one per core, 1 to stay in this process
+    layout_engine = 'python' # Engine used by distribute: can be 'python', 'numpy' (falls back to 'python' without numpy)
+    max_iterations = 10000 # Stop distributing after this many iterations even if not converged, None for no limit
+    multilevel = False # Coarsen the graph by repeated matchings, lay out the coarsest graph and refine it level by level
+    multilevel_min_nodes = 50 # Stop coarsening at this many nodes
+    profiler = None # profiling.Profiler to record phase timings and iteration counts to, if any
+    relax_hops = 2 # Size of the neighbourhood relax moves, in hops from the moved nodes
+    relax_iterations = 10 # Iterations relax runs for
+    repulsion = 'auto' # Method used to calculate repulsion in distribute: can be 'exact', 'barnes_hut', 'auto'
+    tolerance = 0.01 # Adaptive integration has converged when the step is smaller than this fraction of the edge rest length
+
+    def __init__(self, graph, width = 1000, height = 1000, **kwargs):
+        self.graph = graph # Positions are stored on the graph's nodes as x and y
+        self.width = width # Area to lay the graph out in
+        self.height = height
+
+        for kwarg in kwargs:
+            setattr(self, kwarg, kwargs[kwarg])
+
+    def positions(self):
+        return {n.name: (n.x, n.y) for n in self.graph.nodes}
+
+    def grid(self): # Spread nodes out in a grid as a starting point
+        n = len(self.graph.nodes)
+        if n == 0:
+            return {}
+
+        grid_size = math.ceil(n ** (1 / 2))
+        offset_x, offset_y = int(self.width * 0.1), int(self.height * 0.1)
+        step_x = max(1, int((self.width * 0.8) / grid_size))
+        step_y = max(1, int((self.height * 0.8) / grid_size))
+        columns = len(range(0, int(self.width * 0.8), step_x)) # Rounding can fit more than grid_size in a row
+        for i, node in enumerate(self.graph.nodes):
+            row, column = divmod(i, columns)
+            node.x = column * step_x + offset_x
+            node.y = row * step_y + offset_y
+            node._x_force = 0
+            node._y_force = 0
+
+        return self.positions()
+
+    def scale(self):
+        if not self.graph.nodes:
+            return {}
+
+        x = [n.x for n in self.graph.nodes]
+        width = max(x) - min(x)
+        x = (self.height / width) * 0.8 if width else 1 # 80 % of screen width, an axis the nodes are all on one line of isn't scaled
+        
+        y = [n.y for n in self.graph.nodes]
+        height = max(y) - min(y)
+        y = (self.height / height) * 0.8 if height else 1 # 80 % of screen height
+
+        for n in self.graph.nodes:
+            n.x = int(n.x * x)
+            n.y = int(n.y * y)
+            
+        adjust_x = int(min([n.x for n in self.graph.nodes]) - (0.1 * self.width if width else self.width / 2)) # Centre collapsed axes
+        adjust_y = int(min([n.y for n in self.graph.nodes]) - (0.1 * self.height if height else self.height / 2))
+
+        for n in self.graph.nodes: # Shift scaled graph to fit on screen
+            n.x -= adjust_x
+            n.y -= adjust_y
+
+        return self.positions()
+
+    def distribute(self, frame = None): # frame is called after each iteration, e.g. to draw the graph
+        if self.layout_components:
+            self._distribute_components()
+            if frame:
+                frame()
+            return self.positions()
+
+        if self.multilevel and len(self.graph.nodes) > self.multilevel_min_nodes: # Refinement always uses adaptive integration
+            return self._converge(frame, 'adaptive', self._distribute_coarse())
+        return self._converge(frame, self.integration)
+
+    def relax(self, nodes, hops = None, iterations = None): # Adjust the layout around nodes that have been moved, returns {name: (x, y)} of the adjusted nodes
+        # Only nodes within hops of them move, for a fixed number of iterations, repelled by each other and the nodes just beyond them
+        hops = self.relax_hops if hops is None else hops
+        iterations = self.relax_iterations if iterations is None else iterations
+
+        depth = {} # Name -> hops from the nearest moved node
+        frontier = []
+        for node in nodes:
+            name = self.graph.get_node(node).name
+            depth[name] = 0
+            frontier.append(name)
+        for d in range(1, hops + 2): # One hop further than the nodes that move, as they hold the region in place
+            frontier = [v.name for u in frontier for v in self.graph.get_neighbours(u) if v.name not in depth]
+            for name in frontier:
+                depth.setdefault(name, d)
+
+        region = [self.graph.get_node(name) for name in depth]
+        active = [node for node in region if depth[node.name] <= hops and not getattr(node, '_fixed', False)]
+        edges = list({edge: None for node in active for edge in self.graph.get_neighbour_edges(node)}) # Each edge once, in a stable order
+        cooling = _Cooling(min(self.width, self.height) / 80, self.cooling)
+        for _ in range(iterations):
+            self._repulse_exact(active, region)
+            self._attract(edges)
+            if self.integration == 'adaptive':
+                self._move_adaptive(active, cooling)
+            else:
+                self._move(active)
+        if self.profiler:
+            self.profiler.count('relaxations')
+            self.profiler.gauge('relaxed_nodes', len(active))
+
+        return {node.name: (node.x, node.y) for node in active}
+
+    def _converge(self, frame, integration, step = None): # Iterate until converged, adaptive integration starts with step
+        profiler = self.profiler
+        t = time.perf_counter() if profiler else 0
+        pseudo_edges = self._pseudo_edges()
+        if profiler:
+            profiler.record('pseudo_edges', t)
+            profiler.count('distributions')
+
+        rest_length = min(self.width, self.height) / 10
+        cooling = _Cooling(rest_length if step is None else step, self.cooling)
+        if self.layout_engine == 'numpy' and _import_numpy() is not None:
+            self._distribute_numpy(pseudo_edges, frame, integration, cooling)
+            return self.positions()
+
+        prev = math.inf
+        iterations = 0
+        converged = False
+        while self.max_iterations is None or iterations < self.max_iterations:
+            if integration == 'adaptive':
+                total_force = self._step_adaptive(pseudo_edges, cooling)
+            else:
+                total_force = self._step(pseudo_edges)
+            iterations += 1
+
+            if frame:
+                frame()
+
+            converged = cooling.step < self.tolerance * rest_length if integration == 'adaptive' else total_force == prev
+            if converged:
+                break
+            prev = total_force
+
+        if profiler:
+            if converged:
+                profiler.count('converged')
+            profiler.gauge('iterations', iterations)
+            profiler.gauge('total_force', total_force)
+        return self.positions()
+
+    def _pseudo_edges(self):
+        pseudo_edges = [] # Edges that ensure lonely nodes don't get flung into the void
+        degrees = {node: self.graph.degree(node) for node in self.graph.nodes}
+        isolated = [node for node, d in degrees.items() if d == 0]
+        if not isolated:
+            return pseudo_edges
+
+        if len(self.graph.edges) == 0:
+            targets = self.graph.nodes
+        else: # Attach to the nodes with the lowest degree
+            lowest_degree = min(d for d in degrees.values() if d > 0)
+            targets = [node for node, d in degrees.items() if d == lowest_degree]
+        for node in isolated:
+            pseudo_edges.append((node, random.choice(targets)))
+
+        return pseudo_edges
+
+    def _distribute_components(self): # Lay out connected components independently, in a process pool, and pack the results
+        profiler = self.profiler
+        t = time.perf_counter() if profiler else 0
+
+        components = algorithms.connected_components(self.graph)
+        if not components:
+            return
+        where = {name: i for i, component in enumerate(components) for name in component}
+        edges = [[] for _ in components]
+        for edge in self.graph.edges:
+            edges[where[edge.u]].append((edge.u, edge.v))
+
+        jobs = [(c, e, self.graph.directed, self.width, self.height, self._settings()) for c, e in zip(components, edges) if len(c) > 1]
+        jobs.sort(key = lambda job: -len(job[0])) # Start the largest first, so they don't hold up the end
+        workers = self.layout_workers or os.cpu_count() or 1
+        if workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(min(workers, len(jobs))) as pool:
+                results = list(pool.map(_layout_component, jobs, chunksize = max(1, len(jobs) // (workers * 4))))
+        else:
+            results = [_layout_component(job) for job in jobs]
+        results.extend({c[0]: (0, 0)} for c in components if len(c) == 1) # Single nodes need no layout
+        if profiler:
+            t = profiler.record('components', t)
+            profiler.gauge('components', len(components))
+
+        margin = min(self.width, self.height) / 10 # Space around each component, the rest length of an edge
+        boxes = [] # (minimum x, minimum y, width, height) of each component, including margins
+        for positions in results:
+            xs = [p[0] for p in positions.values()]
+            ys = [p[1] for p in positions.values()]
+            boxes.append((min(xs), min(ys), max(xs) - min(xs) + margin, max(ys) - min(ys) + margin))
+
+        area = sum(w * h for _, _, w, h in boxes)
+        corners, (width, height) = _pack([(w, h) for _, _, w, h in boxes], max(max(w for _, _, w, _ in boxes), (area * self.width / self.height) ** (1 / 2)))
+        s = min(self.width / width, self.height / height) * 0.8 # Fit in the middle 80 % of the area, as in scale
+        for positions, (x0, y0, _, _), (cx, cy) in zip(results, boxes, corners):
+            for name, (x, y) in positions.items():
+                node = self.graph.get_node(name)
+                if getattr(node, '_fixed', False): # e.g. held by the mouse, it stays where it was put
+                    continue
+                node.x = int((x - x0 + cx + margin / 2) * s + self.width * 0.1)
+                node.y = int((y - y0 + cy + margin / 2) * s + self.height * 0.1)
+                node._x_force = 0
+                node._y_force = 0
+        if profiler:
+            profiler.record('packing', t)
+
+    def _distribute_coarse(self): # Lay out successively finer coarsenings of the graph, leaving the nodes at the finest one's positions
+        # Returns the step size to refine the graph itself with
+        profiler = self.profiler
+        t = time.perf_counter() if profiler else 0
+
+        index = {node.name: i for i, node in enumerate(self.graph.nodes)}
+        levels = [(len(index), sorted({(index[e.u], index[e.v]) for e in self.graph.edges}), None)] # (nodes, edges, parent of each finer node)
+        while levels[-1][0] > self.multilevel_min_nodes:
+            n, edges, _ = levels[-1]
+            parent, m, coarse = _coarsen(n, edges)
+            if m > n * 0.75: # Matchings aren't shrinking the graph much any more, e.g. it's a star
+                break
+            levels.append((m, coarse, parent))
+        if profiler:
+            t = profiler.record('coarsening', t)
+            profiler.gauge('levels', len(levels))
+
+        rest_length = min(self.width, self.height) / 10
+        settings = dict(self._settings(), integration = 'adaptive', multilevel = False, profiler = self.profiler)
+        positions = None
+        step = rest_length
+        for level in range(len(levels) - 1, -1, -1): # Coarsest first
+            n, edges, _ = levels[level]
+            if level == 0:
+                nodes = self.graph.nodes
+            else:
+                l = Layout(Graph(n, edges), self.width, self.height, **settings)
+                l.grid()
+                nodes = l.graph.nodes
+
+            if positions is not None: # Start each node where its coarse node ended up, spread out around it
+                parent = levels[level + 1][2]
+                for i, node in enumerate(nodes):
+                    if level == 0 and getattr(node, '_fixed', False):
+                        continue
+                    x, y = positions[parent[i]]
+                    node.x = x + rest_length / 4 * math.cos(i * _golden_angle)
+                    node.y = y + rest_length / 4 * math.sin(i * _golden_angle)
+                    node._x_force = 0
+                    node._y_force = 0
+                step = rest_length / 8 # Refinement only needs to make local adjustments
+
+            if level > 0:
+                l._converge(None, 'adaptive', step)
+                positions = [(node.x, node.y) for node in nodes]
+        if profiler:
+            profiler.record('multilevel', t)
+        return step
+
+    def _settings(self): # Settings passed on to layouts of components and coarsened graphs
+        keys = ['barnes_hut_theta', 'barnes_hut_threshold', 'cooling', 'integration', 'layout_chunk_size', 'layout_engine', 'max_iterations', 'multilevel', 'multilevel_min_nodes', 'repulsion', 'tolerance']
+        return {k: getattr(self, k) for k in keys}
+
+    def _forces(self, pseudo_edges): # Set _x_force and _y_force on the nodes, returns the total force
+        profiler = self.profiler
+        t = time.perf_counter() if profiler else 0
+        total_force = 0
+
+        if self.repulsion == 'barnes_hut' or (self.repulsion == 'auto' and len(self.graph.nodes) > self.barnes_hut_threshold):
+            total_force += self._repulse_barnes_hut()
+        else:
+            total_force += self._repulse_exact()
+        if profiler:
+            t = profiler.record('repulsion', t)
+
+        total_force += self._attract(self.graph.edges + pseudo_edges)
+        if profiler:
+            profiler.record('attraction', t)
+
+        return total_force
+
+    def _attract(self, edges): # Add spring forces along edges to the forces on their ends, returns the total force
+        total_force = 0
+        for edge in edges:
+            if type(edge) == tuple: # Pseudo edges are tuples of (u, v)
+                u = edge[0]
+                v = edge[1]
+            else: # While self.graph.edges are Edge objects
+                u = self.graph._nodes[edge.u]
+                v = self.graph._nodes[edge.v]
+            dist = ((abs(u.x - v.x) ** 2) + (abs(u.y - v.y) ** 2)) ** (1 / 2)
+            force = (-1 / len(self.graph.nodes)) * abs((min(self.width, self.height) / 10) - dist) # Hookes law, where k is 1/|v|
+            # Scale k to avoid 'singularity' situation
+
+            total_force += force
+
+            direction = math.atan2((u.y - v.y), (u.x - v.x))
+            
+            u._x_force += force * math.cos(direction)
+            u._y_force += force * math.sin(direction)
+            v._x_force += force * math.cos(direction + math.pi) # Add pi, as force is in opposite direction
+            v._y_force += force * math.sin(direction + math.pi)
+
+        return total_force
+
+    def _step(self, pseudo_edges): # One iteration of the python engine with unit integration, returns the total force
+        total_force = self._forces(pseudo_edges)
+        profiler = self.profiler
+        t = time.perf_counter() if profiler else 0
+
+        self._move(self.graph.nodes)
+        if profiler:
+            profiler.record('integration', t)
+            profiler.count('iterations')
+
+        return total_force
+
+    def _step_adaptive(self, pseudo_edges, cooling): # As _step, but each node moves the cooled step size along its force
+        total_force = self._forces(pseudo_edges)
+        profiler = self.profiler
+        t = time.perf_counter() if profiler else 0
+
+        self._move_adaptive(self.graph.nodes, cooling)
+        if profiler:
+            profiler.record('integration', t)
+            profiler.count('iterations')
+
+        return total_force
+
+    def _move(self, nodes): # Unit integration, move nodes by their forces
+        for node in nodes:
+            if hasattr(node, '_fixed') and node._fixed:
+                continue
+            node.x += int(node._x_force)
+            node.y += int(node._y_force)
+
+    def _move_adaptive(self, nodes, cooling): # Adaptive integration, move nodes the cooled step size along their forces
+        step = cooling.step
+        energy = 0
+        for node in nodes:
+            if hasattr(node, '_fixed') and node._fixed:
+                continue
+            force = math.hypot(node._x_force, node._y_force)
+            if force:
+                energy += force ** 2
+                node.x += step * node._x_force / force
+                node.y += step * node._y_force / force
+        cooling.update(energy)
+
+    def _distribute_numpy(self, pseudo_edges, frame, integration = 'unit', cooling = None): # As the python engine, with node state held in arrays
+        n = len(self.graph.nodes)
+        if n == 0:
+            return
+
+        index = {node.name: i for i, node in enumerate(self.graph.nodes)}
+        u = numpy.array([index[e.u] for e in self.graph.edges] + [index[e[0].name] for e in pseudo_edges], dtype = numpy.intp)
+        v = numpy.array([index[e.v] for e in self.graph.edges] + [index[e[1].name] for e in pseudo_edges], dtype = numpy.intp)
+
+        k = (min(self.width, self.height) ** 2) / n # Coulomb constant, as in _repulse_exact
+        singular = max(self.width, self.height) ** (1 / 2) # Force between coincident nodes
+        rest_length = min(self.width, self.height) / 10 # Hookes law, as in distribute
+        chunk = max(1, self.layout_chunk_size // n) # Rows of the pairwise matrices computed at once
+
+        def load(): # Read positions from the nodes, which may have been dragged
+            x = numpy.array([node.x for node in self.graph.nodes], dtype = float)
+            y = numpy.array([node.y for node in self.graph.nodes], dtype = float)
+            fixed = numpy.array([bool(getattr(node, '_fixed', False)) for node in self.graph.nodes])
+            return x, y, fixed
+
+        def store(x, y, x_force, y_force):
+            for i, node in enumerate(self.graph.nodes):
+                node.x = int(x[i]) if integration == 'unit' else float(x[i])
+                node.y = int(y[i]) if integration == 'unit' else float(y[i])
+                node._x_force = float(x_force[i])
+                node._y_force = float(y_force[i])
+
+        x, y, fixed = load()
+        profiler = self.profiler
+        rest_length = min(self.width, self.height) / 10
+        prev = math.inf
+        iterations = 0
+        converged = False
+        while self.max_iterations is None or iterations < self.max_iterations:
+            total_force = 0.0
+            t = time.perf_counter() if profiler else 0
+
+            x_force = numpy.zeros(n)
+            y_force = numpy.zeros(n)
+            for start in range(0, n, chunk):
+                rows = numpy.arange(start, min(start + chunk, n))
+                rows = rows[~fixed[rows]]
+                if not len(rows):
+                    continue
+
+                dx = x[rows, None] - x[None, :]
+                dy = y[rows, None] - y[None, :]
+                r_squared = dx ** 2 + dy ** 2
+                r_squared[numpy.arange(len(rows)), rows] = numpy.nan # A node doesn't repel itself
+                coincident = r_squared == 0
+                r_squared[coincident] = 1
+                force = k / r_squared
+                r = numpy.sqrt(r_squared)
+                x_part = numpy.where(coincident, singular, force * dx / r) # atan2(0, 0) is 0, so coincident nodes push along x
+                y_part = numpy.where(coincident, 0, force * dy / r)
+                force[coincident] = singular
+
+                x_force[rows] = numpy.nansum(x_part, axis = 1)
+                y_force[rows] = numpy.nansum(y_part, axis = 1)
+                total_force += numpy.nansum(force)
+            if profiler:
+                t = profiler.record('repulsion', t)
+
+            dx = x[u] - x[v]
+            dy = y[u] - y[v]
+            dist = numpy.sqrt(dx ** 2 + dy ** 2)
+            force = (-1 / n) * numpy.abs(rest_length - dist)
+            total_force += force.sum()
+            apart = dist != 0
+            dist[~apart] = 1
+            x_part = numpy.where(apart, force * dx / dist, force) # Coincident ends pull along x, as atan2(0, 0) is 0
+            y_part = numpy.where(apart, force * dy / dist, 0)
+            numpy.add.at(x_force, u, x_part)
+            numpy.add.at(y_force, u, y_part)
+            numpy.add.at(x_force, v, -x_part)
+            numpy.add.at(y_force, v, -y_part)
+            if profiler:
+                t = profiler.record('attraction', t)
+
+            moving = ~fixed
+            if integration == 'adaptive':
+                force = numpy.hypot(x_force, y_force)
+                moving &= force != 0
+                x[moving] += cooling.step * x_force[moving] / force[moving]
+                y[moving] += cooling.step * y_force[moving] / force[moving]
+                cooling.update(float((force[moving] ** 2).sum()))
+            else:
+                x[moving] += numpy.trunc(x_force[moving])
+                y[moving] += numpy.trunc(y_force[moving])
+            total_force = float(total_force)
+            iterations += 1
+            if profiler:
+                profiler.record('integration', t)
+                profiler.count('iterations')
+
+            if frame:
+                store(x, y, x_force, y_force)
+                frame()
+                x, y, fixed = load()
+
+            converged = cooling.step < self.tolerance * rest_length if integration == 'adaptive' else total_force == prev
+            if converged:
+                break
+            prev = total_force
+
+        store(x, y, x_force, y_force)
+        if profiler:
+            if converged:
+                profiler.count('converged')
+            profiler.gauge('iterations', iterations)
+            profiler.gauge('total_force', total_force)
+
+    def _repulse_exact(self, nodes = None, others = None): # Coulomb repulsion on nodes from others, all pairs of nodes by default, O(n^2)
+        total_force = 0
+        others = self.graph.nodes if others is None else others
+        for node in self.graph.nodes if nodes is None else nodes:
+            if hasattr(node, '_fixed') and node._fixed:
+                continue
+            x_force = 0 # Accumulated locally, as setting attributes on nodes is slower
+            y_force = 0
+            for other in others:
+                if node != other:
+                    r_squared = ((abs(node.x - other.x) ** 2) + (abs(node.y - other.y) ** 2))
+                    if r_squared == 0:
+                        force = max(self.width, self.height) ** (1 / 2)
+                    else:
+                        force = ((min(self.width, self.height) ** 2) / len(self.graph.nodes)) / r_squared # k * (q1*q2)/r^2, where k is 1 (coulombs law)
+                    direction = math.atan2((node.y - other.y), (node.x - other.x))
+                    x_force += force * math.cos(direction)
+                    y_force += force * math.sin(direction)
+
+                    total_force += force
+
+            node._x_force = x_force
+            node._y_force = y_force
+
+        return total_force
+
+    def _repulse_barnes_hut(self): # Approximate repulsion using a quadtree, O(n log n)
+        if not self.graph.nodes:
+            return 0
+
+        k = (min(self.width, self.height) ** 2) / len(self.graph.nodes) # As in _repulse_exact
+        singular = max(self.width, self.height) ** (1 / 2) # Force between coincident nodes
+        theta_squared = self.barnes_hut_theta ** 2
+
+        tree = _QuadTree.build(self.graph.nodes)
+        total_force = 0
+        for node in self.graph.nodes:
+            if hasattr(node, '_fixed') and node._fixed:
+                continue
+            x_force = 0 # Accumulated locally, as setting attributes on nodes is slower
+            y_force = 0
+
+            stack = [tree]
+            while stack:
+                cell = stack.pop()
+                dx = node.x - cell.x
+                dy = node.y - cell.y
+                r_squared = dx ** 2 + dy ** 2
+                if cell.nodes is not None: # Leaf, compute exactly
+                    for other in cell.nodes:
+                        if other is node:
+                            continue
+                        dx = node.x - other.x
+                        dy = node.y - other.y
+                        r_squared = dx ** 2 + dy ** 2
+                        if r_squared == 0:
+                            x_force += singular # atan2(0, 0) is 0, so the exact mode pushes along x
+                            total_force += singular
+                        else:
+                            force = k / r_squared
+                            r = r_squared ** (1 / 2)
+                            x_force += force * dx / r
+                            y_force += force * dy / r
+                            total_force += force
+                elif cell.size ** 2 < theta_squared * r_squared: # Far enough away to treat as one body
+                    force = cell.count * k / r_squared
+                    r = r_squared ** (1 / 2)
+                    x_force += force * dx / r
+                    y_force += force * dy / r
+                    total_force += force
+                else:
+                    stack.extend(cell.children)
+
+            node._x_force = x_force
+            node._y_force = y_force
+
+        return total_force
+
+
+class _QuadTree(): # Region of the plane holding the total charge and centre of mass of the nodes inside it
+    __slots__ = ['x', 'y', 'size', 'count', 'nodes', 'children']
+    max_depth = 32 # Coincident nodes would otherwise subdivide forever
+
+    def __init__(self, nodes, x, y, size, depth):
+        self.count = len(nodes)
+        self.x = sum(n.x for n in nodes) / self.count # Centre of mass
+        self.y = sum(n.y for n in nodes) / self.count
+        self.size = size
+        self.children = []
+        
+        if self.count == 1 or depth >= self.max_depth:
+            self.nodes = nodes
+        else:
+            self.nodes = None
+            half = size / 2
+            quadrants = [[], [], [], []]
+            for n in nodes:
+                quadrants[(n.x >= x + half) + 2 * (n.y >= y + half)].append(n)
+            for i, quadrant in enumerate(quadrants):
+                if quadrant:
+                    self.children.append(_QuadTree(quadrant, x + half * (i & 1), y + half * (i >> 1), half, depth + 1))
+
+    @staticmethod
+    def build(nodes):
+        x = min(n.x for n in nodes)
+        y = min(n.y for n in nodes)
+        size = max(max(n.x for n in nodes) - x, max(n.y for n in nodes) - y) or 1
+        return _QuadTree(list(nodes), x, y, size, 0)
+
+
+class _Cooling(): # Adaptive step size, shrinks when the energy rises and grows after a run of decreases
+    improvements = 5 # Decreases in a row needed to grow the step
+
+    def __init__(self, step, factor):
+        self.step = step
+        self.factor = factor
+        self.energy = math.inf
+        self.progress = 0
+
+    def update(self, energy):
+        if energy < self.energy:
+            self.progress += 1
+            if self.progress >= self.improvements:
+                self.progress = 0
+                self.step /= self.factor
+        else:
+            self.progress = 0
+            self.step *= self.factor
+        self.energy = energy
+
+
+def _coarsen(n, edges): # Contract a maximal matching, returns (coarse node of each node, number of coarse nodes, coarse edges)
+    neighbours = [[] for _ in range(n)]
+    for u, v in edges:
+        if u != v:
+            neighbours[u].append(v)
+            neighbours[v].append(u)
+
+    parent = [-1] * n
+    m = 0
+    for u in sorted(range(n), key = lambda i: len(neighbours[i])): # Low degree nodes first, matched to their lowest degree neighbour
+        if parent[u] != -1:
+            continue
+        parent[u] = m
+        candidates = [v for v in neighbours[u] if parent[v] == -1]
+        if candidates:
+            parent[min(candidates, key = lambda v: len(neighbours[v]))] = m
+        m += 1
+
+    coarse = {(min(parent[u], parent[v]), max(parent[u], parent[v])) for u, v in edges if parent[u] != parent[v]}
+    return parent, m, sorted(coarse)
+
+
+_golden_angle = math.pi * (3 - 5 ** (1 / 2)) # Spreads the nodes of a coarse node evenly around it
+
+
+def _layout_component(job): # Lay out one component, in a worker process. Returns {name: (x, y)}
+    names, edges, directed, width, height, settings = job
+    l = Layout(Graph(names, edges, directed), width, height, **settings)
+    l.grid()
+    return l.distribute()
+
+
+def _pack(sizes, width): # Shelf pack (width, height) rectangles, tallest first, into rows no wider than width where possible
+    corners = [None] * len(sizes) # Top left corner of each rectangle
+    x = y = shelf = used = 0
+    for i in sorted(range(len(sizes)), key = lambda i: -sizes[i][1]):
+        w, h = sizes[i]
+        if x > 0 and x + w > width: # Start a new row
+            x = 0
+            y += shelf
+            shelf = 0
+        corners[i] = (x, y)
+        x += w
+        shelf = max(shelf, h)
+        used = max(used, x)
+    return corners, (used, y + shelf) # and the size of the packing
+
+
+def layout(graph, width = 1000, height = 1000, **kwargs): # Lay out a graph without a window, returns {name: (x, y)}
+    l = Layout(graph, width, height, **kwargs)
+    l.grid()
+    positions = l.distribute()
+    return positions if l.layout_components else l.scale() # Packing components already fits them to the area
@@ -0,0 +1,57 @@
+import time # Timers
+
+class Profiler(): # Collects timings and counters from Layout and DisplayGraph when attached to them
+    frame_buckets = [1, 2, 4, 8, 16, 33, 66, 133, 266, 533, 1000] # Upper bounds of frame time histogram buckets, in ms
+
+    def __init__(self):
+        self.hooks = [] # Called as hook(kind, name, value) for every measurement, kind is 'phase', 'counter', 'gauge' or 'frame'
+        self.reset()
+
+    def reset(self):
+        self.phases = {} # Phase name -> [calls, total seconds, longest seconds]
+        self.counters = {} # Name -> count
+        self.gauges = {} # Name -> latest value
+        self.frames = [0] * (len(self.frame_buckets) + 1) # Frame time histogram, the last bucket is for slower frames
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def record(self, phase, since): # Record the time since a perf_counter() value as a phase, returns the current time
+        now = time.perf_counter()
+        seconds = now - since
+        stats = self.phases.setdefault(phase, [0, 0.0, 0.0])
+        stats[0] += 1
+        stats[1] += seconds
+        stats[2] = max(stats[2], seconds)
+        self._notify('phase', phase, seconds)
+        return now
+
+    def count(self, name, n = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+        self._notify('counter', name, n)
+
+    def gauge(self, name, value):
+        self.gauges[name] = value
+        self._notify('gauge', name, value)
+
+    def frame(self, seconds):
+        ms = seconds * 1000
+        i = 0
+        while i < len(self.frame_buckets) and ms > self.frame_buckets[i]:
+            i += 1
+        self.frames[i] += 1
+        self._notify('frame', 'frame', seconds)
+
+    def report(self): # Summary of everything recorded, suitable for JSON
+        frames = {f'<={b}ms': n for b, n in zip(self.frame_buckets, self.frames)}
+        frames[f'>{self.frame_buckets[-1]}ms'] = self.frames[-1]
+        return {
+            'phases': {p: {'calls': c, 'total': t, 'mean': t / c, 'max': m} for p, (c, t, m) in self.phases.items()},
+            'counters': dict(self.counters),
+            'gauges': dict(self.gauges),
+            'frames': frames
+        }
+
+    def _notify(self, kind, name, value):
+        for hook in self.hooks:
+            hook(kind, name, value)
@@ -0,0 +1,166 @@
+from graph import Graph, _parse_value as _parse, _parse_edge_line # Loaded graphs
+import contextlib # Accept paths or open files
+import json # JSON lines format
+from xml.etree import ElementTree # GraphML reading
+from xml.sax.saxutils import escape, quoteattr # GraphML writing
+
+# Streaming readers and writers for text formats. Readers are generators yielding node and edge dicts
+# ({'name': ...} or {'u': ..., 'v': ...}) one at a time, so files larger than memory can be processed.
+# Writers take a Graph and write it out item by item. The compact binary format is Graph.save/load.
+
+chunk_size = 10000 # Number of items the load functions validate and add at once
+
+
+def write_edge_list(graph, file, attrs = ()): # One edge per line: u v, then the values of attrs
+    with _open(file, 'w') as f:
+        for edge in graph.edges:
+            f.write(' '.join(str(x) for x in [edge.u, edge.v] + [getattr(edge, a, '') for a in attrs]) + '\n')
+
+
+def read_edge_list(file, attrs = ()): # Names and values are read as int or float where possible
+    with _open(file, 'r') as f:
+        for line in f:
+            edge = _parse_edge_line(line, attrs)
+            if edge is not None:
+                yield edge
+
+
+def load_edge_list(file, directed = False, attrs = ()): # Nodes are created as they are seen
+    return _build(read_edge_list(file, attrs), directed)
+
+
+def write_json_lines(graph, file): # A JSON object per node, then per edge
+    with _open(file, 'w') as f:
+        for node in graph.nodes:
+            f.write(json.dumps({'name': node.name, **node.attributes()}) + '\n')
+        for edge in graph.edges:
+            f.write(json.dumps({'u': edge.u, 'v': edge.v, **edge.attributes()}) + '\n')
+
+
+def read_json_lines(file):
+    with _open(file, 'r') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def load_json_lines(file, directed = False):
+    return _build(read_json_lines(file), directed)
+
+
+_graphml_types = {bool: 'boolean', int: 'long', float: 'double', str: 'string'}
+_graphml_parsers = {'boolean': lambda v: v.lower() in ['true', '1'], 'int': int, 'long': int, 'float': float, 'double': float, 'string': str}
+
+
+def write_graphml(graph, file):
+    node_keys = _graphml_keys(graph.nodes)
+    edge_keys = _graphml_keys(graph.edges)
+
+    with _open(file, 'w') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n')
+        for domain, keys in [('node', node_keys), ('edge', edge_keys)]:
+            for key, (i, t) in keys.items():
+                f.write(f'  <key id="{domain[0]}{i}" for="{domain}" attr.name={quoteattr(key)} attr.type="{t}"/>\n')
+        f.write(f'  <graph edgedefault="{"directed" if graph.directed else "undirected"}">\n')
+
+        for node in graph.nodes:
+            f.write(f'    <node id={quoteattr(str(node.name))}>{_graphml_data(node, node_keys, "n")}</node>\n')
+        for edge in graph.edges:
+            f.write(f'    <edge source={quoteattr(str(edge.u))} target={quoteattr(str(edge.v))}>{_graphml_data(edge, edge_keys, "e")}</edge>\n')
+
+        f.write('  </graph>\n</graphml>\n')
+
+
+def read_graphml(file): # Yields {'directed': bool} for the graph element, then node and edge dicts
+    keys = {}
+    parents = [] # Elements enclosing the current one
+    with _open(file, 'rb') as f:
+        for event, element in ElementTree.iterparse(f, events = ['start', 'end']):
+            tag = element.tag.rsplit('}', 1)[-1] # Drop the namespace
+            if event == 'start':
+                if tag == 'graph':
+                    yield {'directed': element.get('edgedefault') == 'directed'}
+                parents.append(element)
+                continue
+            parents.pop()
+
+            if tag == 'key':
+                keys[element.get('id')] = (element.get('attr.name'), _graphml_parsers.get(element.get('attr.type'), str))
+            elif tag in ['node', 'edge']:
+                if tag == 'node':
+                    item = {'name': _parse(element.get('id'))}
+                else:
+                    item = {'u': _parse(element.get('source')), 'v': _parse(element.get('target'))}
+                for data in element:
+                    name, parser = keys.get(data.get('key'), (data.get('key'), str))
+                    item[name] = parser(data.text or '')
+                yield item
+            if tag in ['key', 'node', 'edge'] and parents: # Free parsed elements as we go, the parent would keep them otherwise
+                element.clear()
+                parents[-1].remove(element) # Its last child, as earlier ones have been removed
+
+
+def load_graphml(file):
+    items = read_graphml(file)
+    directed = False
+    for item in items: # The graph element comes before any nodes or edges
+        if 'directed' in item:
+            directed = item['directed']
+            break
+    return _build(items, directed)
+
+
+@contextlib.contextmanager
+def _open(file, mode): # Open paths, pass through open files
+    if type(file) == str:
+        with open(file, mode) as f:
+            yield f
+    else:
+        yield file
+
+
+def _build(items, directed): # Add node and edge dicts to a new graph in chunks, creating missing nodes
+    g = Graph(directed = directed)
+    nodes, edges = [], []
+
+    def flush():
+        new = {}
+        for n in nodes:
+            existing = g.get_node(n['name'])
+            if existing is not None: # Created earlier for an edge, or declared twice
+                for key, value in n.items():
+                    setattr(existing, key, value)
+            else:
+                new.setdefault(n['name'], {}).update(n)
+        g.add_nodes(new.values())
+        g.ingest(edges, chunk_size = chunk_size, create_nodes = True, duplicates = 'error')
+        nodes.clear()
+        edges.clear()
+
+    for item in items:
+        if 'u' in item and 'v' in item:
+            edges.append(item)
+        elif 'name' in item:
+            nodes.append(item)
+        if len(nodes) + len(edges) >= chunk_size:
+            flush()
+    flush()
+
+    return g
+
+
+def _graphml_keys(items): # Attribute name -> (key index, GraphML type), the type being one that fits every value
+    keys = {}
+    for item in items:
+        for key, value in item.attributes().items():
+            t = _graphml_types.get(type(value), 'string')
+            if key not in keys:
+                keys[key] = (len(keys), t)
+            elif keys[key][1] != t:
+                i, old = keys[key]
+                keys[key] = (i, 'double' if {old, t} == {'long', 'double'} else 'string') # Otherwise values can't be read back as one type
+    return keys
+
+
+def _graphml_data(item, keys, prefix):
+    return ''.join(f'<data key="{prefix}{keys[k][0]}">{escape(str(v))}</data>' for k, v in item.attributes().items() if k in keys)